@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,6 +45,7 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = 'myapp.UserProfile'
 
 MIDDLEWARE = [
+    'myapp.middleware.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -75,6 +77,11 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'librarySite.wsgi.application'
 
+# Serve the catalog, book, author, genre and profile pages from async views.
+# Only worth it under ASGI (librarySite.asgi.application), where the event
+# loop can then hold many slow clients without a thread each.
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS') == '1'
+
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
@@ -91,6 +98,65 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# 'default' holds the navigation menus and content versions, 'pages' the
+# anonymous full-page cache. Local memory is per process, so production should
+# point both at a shared backend, e.g.
+# DJANGO_CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+# DJANGO_CACHE_LOCATION=redis://127.0.0.1:6379/1
+# PAGE_CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache
+# PAGE_CACHE_LOCATION=/var/tmp/library_pages
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('DJANGO_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('DJANGO_CACHE_LOCATION', 'library-default'),
+    },
+    'pages': {
+        'BACKEND': os.environ.get('PAGE_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('PAGE_CACHE_LOCATION', 'library-pages'),
+    },
+}
+
+PAGE_CACHE_TIMEOUT = 60 * 10
+
+
+# Live borrow request updates
+# /requests/events/ streams borrow request changes to the borrower and the
+# librarians. It only works under ASGI (librarySite.asgi.application, e.g.
+# with uvicorn or daphne), where an idle stream holds no thread; under WSGI
+# (runserver) pages leave the stream out and the endpoint answers 204.
+# The in-process backend only reaches streams of the same process.
+
+EVENTS_BACKEND = os.environ.get('EVENTS_BACKEND', 'myapp.events.InProcessBackend')
+
+
+# Request timing
+# REQUEST_TIMING=1 adds a Server-Timing header with query count, database,
+# template and total time to every response and logs the same numbers, plus
+# any repeated queries, on the 'myapp.timing' logger.
+
+REQUEST_TIMING = os.environ.get('REQUEST_TIMING') == '1'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'myapp.timing': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -124,8 +190,23 @@ USE_TZ = True
 
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/4.2/howto/static-files/
+# Bootstrap is vendored under myapp/static (manage.py vendor_assets), so no
+# page loads anything from a CDN. collectstatic writes content-hashed copies
+# with .gz/.br siblings to STATIC_ROOT; serve them with far-future caching,
+# e.g. the nginx 'static' service of docker-compose.yml and
+# STATIC_URL=http://localhost:8080/static/
+
+STATIC_URL = os.environ.get('STATIC_URL', 'static/')
+STATIC_ROOT = BASE_DIR / 'static'
 
-STATIC_URL = 'static/'
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'myapp.storage.CompressedManifestStaticFilesStorage',
+    },
+}
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
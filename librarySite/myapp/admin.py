@@ -1,9 +1,10 @@
 from django.contrib import admin
-from .models import Genre, Author, Book, BorrowRequestModel, UserProfile
+from .models import Genre, Author, Book, BorrowRequestArchive, BorrowRequestModel, UserProfile
 
 admin.site.register(Genre)
 admin.site.register(Author)
 admin.site.register(Book)
 admin.site.register(BorrowRequestModel)
+admin.site.register(BorrowRequestArchive)
 admin.site.register(UserProfile)
 
@@ -0,0 +1,109 @@
+from rest_framework import permissions, viewsets
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+from .conditional import conditional_response, version_timestamp
+from .models import Author, Book, BorrowRequestModel, Genre
+from .serializers import AuthorSerializer, BookSerializer, BorrowRequestSerializer, GenreSerializer
+from .stats import circulation_stats, parse_days
+from .versions import get_version
+
+
+class SyncCursorPagination(CursorPagination):
+    ordering = 'pk'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class VersionConditionalMixin:
+    """
+    Answers If-None-Match/If-Modified-Since from the cached content versions
+    alone, so an unchanged resource costs no database query.
+    """
+
+    version_namespaces = ('catalog',)
+
+    def get_etag_scope(self, request):
+        return ''
+
+    def conditional(self, handler, request, *args, **kwargs):
+        version = max(get_version(namespace) for namespace in self.version_namespaces)
+        etag_parts = [version, request.get_full_path(), self.get_etag_scope(request)]
+        return conditional_response(
+            request, etag_parts, version_timestamp(version), lambda: handler(request, *args, **kwargs)
+        )
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(super().retrieve, request, *args, **kwargs)
+
+
+class GenreViewSet(VersionConditionalMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = Genre.objects.all()
+    serializer_class = GenreSerializer
+    pagination_class = SyncCursorPagination
+
+
+class AuthorViewSet(VersionConditionalMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = Author.objects.all()
+    serializer_class = AuthorSerializer
+    pagination_class = SyncCursorPagination
+
+
+class BookViewSet(VersionConditionalMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = Book.objects.defer('search_vector')
+    serializer_class = BookSerializer
+    pagination_class = SyncCursorPagination
+    lookup_field = 'isbn'
+
+
+class BorrowRequestViewSet(VersionConditionalMixin, viewsets.ReadOnlyModelViewSet):
+    serializer_class = BorrowRequestSerializer
+    pagination_class = SyncCursorPagination
+    permission_classes = [permissions.IsAuthenticated]
+    version_namespaces = ('catalog', 'requests')
+
+    def is_librarian(self, user):
+        return user.is_librarian or user.is_staff
+
+    def get_etag_scope(self, request):
+        return 'all' if self.is_librarian(request.user) else request.user.pk
+
+    def get_queryset(self):
+        queryset = BorrowRequestModel.objects.select_related('book', 'borrower').only(
+            'status', 'overdue', 'request_date', 'approval_date', 'due_date', 'complete_date',
+            'book__isbn', 'borrower__username',
+        )
+        if not self.is_librarian(self.request.user):
+            queryset = queryset.filter(borrower=self.request.user)
+        return queryset
+
+
+class IsLibrarian(permissions.BasePermission):
+    def has_permission(self, request, view):
+        return request.user.is_authenticated and (request.user.is_librarian or request.user.is_staff)
+
+
+class CirculationStatsViewSet(VersionConditionalMixin, viewsets.ViewSet):
+    """
+    Circulation statistics from the daily rollups, over the last ?days=N days
+    or all time. Revalidation is free until rollup_circulation runs again.
+    """
+
+    permission_classes = [IsLibrarian]
+    version_namespaces = ('circulation',)
+
+    def get_stats(self, request):
+        days = request.query_params.get('days', '')
+        try:
+            days = parse_days(days) if days else None
+        except ValueError:
+            raise ValidationError({'days': 'Expected a number of days.'})
+        return Response(circulation_stats(days))
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(self.get_stats, request)
@@ -0,0 +1,37 @@
+import time
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user
+from django.core.handlers.asgi import ASGIRequest
+from django.shortcuts import render
+
+from .navigation import aget_navigation
+
+
+def served_by_asgi(request):
+    return isinstance(request, ASGIRequest)
+
+
+class AsyncReadMixin:
+    """
+    Base for the async read views. Everything the templates and context
+    processors would otherwise load lazily, the user and the navigation, is
+    resolved up front, and the page is rendered in the handler, so rendering
+    never touches the database and needs no worker thread. Views must pass
+    fully fetched objects (select_related / prefetch_related) to the template.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        request.user = await sync_to_async(get_user)(request)
+        await aget_navigation(request)
+        return await super().dispatch(request, *args, **kwargs)
+
+    def render_to_response(self, context, **response_kwargs):
+        context.setdefault('view', self)
+        started = time.perf_counter()
+        response = render(self.request, self.template_name, context, **response_kwargs)
+        # rendered here rather than as a TemplateResponse after the view, so
+        # RequestTimingMiddleware.process_template_response never sees it
+        if hasattr(self.request, '_timing'):
+            self.request._timing['template'] += time.perf_counter() - started
+        return response
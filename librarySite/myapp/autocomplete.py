@@ -0,0 +1,38 @@
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.postgres.lookups import TrigramSimilar
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connection
+from django.db.models import F
+
+AUTOCOMPLETE_LIMIT = getattr(settings, 'AUTOCOMPLETE_LIMIT', 20)
+AUTOCOMPLETE_MAX_TERM_LENGTH = 64
+
+
+@lru_cache(maxsize=None)
+def has_trigram_support():
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+def lookup_choices(queryset, field, term, limit=AUTOCOMPLETE_LIMIT):
+    # Prefix matches come first and are served by the upper(field) pattern
+    # index; fuzzy trigram matches only fill the remaining slots.
+    term = term.strip()[:AUTOCOMPLETE_MAX_TERM_LENGTH]
+    if not term:
+        return []
+    prefix = list(queryset.filter(**{f'{field}__istartswith': term}).order_by(field).values_list('pk', field)[:limit])
+    if len(prefix) < limit and len(term) >= 3 and has_trigram_support():
+        fuzzy = (
+            queryset.filter(TrigramSimilar(F(field), term))
+            .exclude(pk__in=[pk for pk, _ in prefix])
+            .annotate(similarity=TrigramSimilarity(field, term))
+            .order_by('-similarity', field)
+            .values_list('pk', field)[:limit - len(prefix)]
+        )
+        prefix.extend(fuzzy)
+    return [{'id': pk, 'text': label} for pk, label in prefix]
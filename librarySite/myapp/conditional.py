@@ -0,0 +1,93 @@
+from datetime import datetime, timezone
+from hashlib import md5
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from .versions import aget_version, get_version
+
+
+def version_timestamp(version):
+    return datetime.fromtimestamp(version / 1000, tz=timezone.utc)
+
+
+def _validators(etag_parts, last_modified):
+    etag = '"%s"' % md5(':'.join(str(part) for part in etag_parts).encode()).hexdigest()
+    return etag, int(last_modified.timestamp())
+
+
+def _set_validators(response, etag, timestamp):
+    if response.status_code in (200, 304):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(timestamp)
+        patch_cache_control(response, no_cache=True)
+    return response
+
+
+def conditional_response(request, etag_parts, last_modified, handler):
+    """
+    Answers If-None-Match/If-Modified-Since from cheap validators and only
+    calls handler() to build the full response when they do not match.
+    """
+    etag, timestamp = _validators(etag_parts, last_modified)
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        response = handler()
+    return _set_validators(response, etag, timestamp)
+
+
+async def aconditional_response(request, etag_parts, last_modified, handler):
+    # as conditional_response(), with a coroutine function as handler
+    etag, timestamp = _validators(etag_parts, last_modified)
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        response = await handler()
+    return _set_validators(response, etag, timestamp)
+
+
+class ConditionalGetMixin:
+    """
+    Detail view mixin: get_last_modified() returns the object's modification
+    time, and the page is only rendered when the client's validators are
+    stale. Pages also depend on the navbar, the viewer and any content
+    version listed in get_version_namespaces().
+    Async views implement aget_last_modified() and call aconditional_get().
+    """
+
+    version_namespaces = ('navigation',)
+
+    def get_last_modified(self):
+        raise NotImplementedError
+
+    async def aget_last_modified(self):
+        raise NotImplementedError
+
+    def get_version_namespaces(self):
+        return self.version_namespaces
+
+    def get_etag_parts(self, request, last_modified, versions):
+        etag_parts = [request.get_full_path(), last_modified.isoformat(), *versions]
+        if request.user.is_authenticated:
+            etag_parts += [request.user.pk, request.user.is_librarian, request.user.is_staff]
+        return etag_parts
+
+    def get(self, request, *args, **kwargs):
+        last_modified = self.get_last_modified()
+        if last_modified is None:
+            return super().get(request, *args, **kwargs)
+        versions = [get_version(namespace) for namespace in self.get_version_namespaces()]
+        last_modified = max([last_modified] + [version_timestamp(version) for version in versions])
+        return conditional_response(
+            request, self.get_etag_parts(request, last_modified, versions), last_modified,
+            lambda: super(ConditionalGetMixin, self).get(request, *args, **kwargs),
+        )
+
+    async def aconditional_get(self, request, handler):
+        last_modified = await self.aget_last_modified()
+        if last_modified is None:
+            return await handler()
+        versions = [await aget_version(namespace) for namespace in self.get_version_namespaces()]
+        last_modified = max([last_modified] + [version_timestamp(version) for version in versions])
+        return await aconditional_response(
+            request, self.get_etag_parts(request, last_modified, versions), last_modified, handler,
+        )
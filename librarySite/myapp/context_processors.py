@@ -1,9 +1,10 @@
-from .models import Genre, Author, BorrowRequestModel
+from .navigation import get_navigation
 
 
 def genres(request):
-    return {'genres': Genre.objects.all()}
+    return {'genres': get_navigation(request)['genres']}
 
 
 def authors(request):
-    return {'authors': Author.objects.all()}
+    navigation = get_navigation(request)
+    return {'authors': navigation['authors'], 'authors_more': navigation['authors_more']}
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+from django.urls import reverse
+from django.utils.module_loading import import_string
+
+from .models import BorrowRequestModel
+
+EVENTS_BACKEND = getattr(settings, 'EVENTS_BACKEND', 'myapp.events.InProcessBackend')
+EVENTS_QUEUE_SIZE = getattr(settings, 'EVENTS_QUEUE_SIZE', 100)
+EVENTS_KEEPALIVE = getattr(settings, 'EVENTS_KEEPALIVE', 15)
+# Django 4.2 does not notice a client going away in the middle of a stream,
+# so every stream ends after a while and the browser reconnects
+EVENTS_STREAM_TIMEOUT = getattr(settings, 'EVENTS_STREAM_TIMEOUT', 60 * 5)
+
+LIBRARIANS_CHANNEL = 'librarians'
+
+
+def user_channel(user_id):
+    return f'user:{user_id}'
+
+
+class BaseBackend:
+    """
+    publish() is called from request threads, subscribe() from the event loop
+    serving a stream. A backend shared between processes (Redis, Postgres
+    LISTEN/NOTIFY) implements the same two methods.
+    """
+
+    def publish(self, channels, event):
+        raise NotImplementedError
+
+    def subscribe(self, channels):
+        # async context manager yielding an asyncio.Queue of events
+        raise NotImplementedError
+
+
+class InProcessBackend(BaseBackend):
+    """
+    Fans events out to the streams served by this process only, so with more
+    than one worker process a stream only sees events published in its own.
+    """
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def publish(self, channels, event):
+        with self._lock:
+            subscribers = {subscriber for channel in channels for subscriber in self._subscribers.get(channel, ())}
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(self._deliver, queue, event)
+
+    @staticmethod
+    def _deliver(queue, event):
+        # a stream that stopped reading loses events rather than memory
+        if not queue.full():
+            queue.put_nowait(event)
+
+    def subscribe(self, channels):
+        return InProcessSubscription(self, channels)
+
+    def _add(self, channels, subscriber):
+        with self._lock:
+            for channel in channels:
+                self._subscribers.setdefault(channel, set()).add(subscriber)
+
+    def _remove(self, channels, subscriber):
+        with self._lock:
+            for channel in channels:
+                subscribers = self._subscribers.get(channel, set())
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    self._subscribers.pop(channel, None)
+
+
+class InProcessSubscription:
+    def __init__(self, backend, channels):
+        self.backend = backend
+        self.channels = tuple(channels)
+
+    async def __aenter__(self):
+        self.subscriber = (asyncio.get_running_loop(), asyncio.Queue(EVENTS_QUEUE_SIZE))
+        self.backend._add(self.channels, self.subscriber)
+        return self.subscriber[1]
+
+    async def __aexit__(self, *exc_info):
+        self.backend._remove(self.channels, self.subscriber)
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    return import_string(EVENTS_BACKEND)()
+
+
+async def stream_events(channels):
+    """
+    Server-Sent Events for the channels. While idle the stream only waits on
+    its queue and sends comments to keep proxies from closing it, so an open
+    stream costs no database queries.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + EVENTS_STREAM_TIMEOUT
+    async with get_backend().subscribe(channels) as queue:
+        yield f'retry: {int(EVENTS_KEEPALIVE * 1000)}\n\n'
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                event = await asyncio.wait_for(queue.get(), min(EVENTS_KEEPALIVE, remaining))
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+            else:
+                yield f'event: borrow_request\ndata: {event}\n\n'
+
+
+def borrow_request_event(borrow_request):
+    status = borrow_request.get_status_display()
+    if borrow_request.status == BorrowRequestModel.PENDING:
+        message = f'New borrow request #{borrow_request.pk}.'
+    else:
+        message = f'Borrow request #{borrow_request.pk} is now {status}.'
+    return {
+        'id': borrow_request.pk,
+        'book': borrow_request.book_id,
+        'status': borrow_request.status,
+        'status_label': status,
+        'message': message,
+        'url': reverse('borrow_request_view', kwargs={'id': borrow_request.pk}),
+    }
+
+
+def publish_borrow_request(borrow_request):
+    """Tells the borrower and the librarians, once the change is committed."""
+    channels = [LIBRARIANS_CHANNEL]
+    if borrow_request.borrower_id is not None:
+        channels.append(user_channel(borrow_request.borrower_id))
+    event = json.dumps(borrow_request_event(borrow_request))
+    transaction.on_commit(lambda: get_backend().publish(channels, event))
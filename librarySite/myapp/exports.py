@@ -0,0 +1,106 @@
+import csv
+import json
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Book, BorrowRequestArchive, BorrowRequestModel
+
+EXPORT_CHUNK_SIZE = 2000
+LIST_SEPARATOR = '|'  # same default as the import_catalog command
+
+BOOK_FIELDS = ['isbn', 'title', 'summary', 'publisher', 'published_date', 'available', 'authors', 'genres']
+REQUEST_FIELDS = [
+    'id', 'status', 'book_isbn', 'book_title', 'borrower', 'overdue',
+    'request_date', 'approval_date', 'due_date', 'complete_date',
+]
+
+
+def book_rows(chunk_size=EXPORT_CHUNK_SIZE):
+    # iterator() streams from a server-side cursor, so memory is bounded by
+    # chunk_size, not the table; names come from the denormalised summaries.
+    books = Book.objects.order_by('pk').defer('search_vector')
+    for book in books.iterator(chunk_size=chunk_size):
+        yield {
+            'isbn': book.isbn,
+            'title': book.title,
+            'summary': book.summary,
+            'publisher': book.publisher,
+            'published_date': book.published_date,
+            'available': book.available,
+            'authors': book.author_names,
+            'genres': book.genre_names,
+        }
+
+
+def request_rows(chunk_size=EXPORT_CHUNK_SIZE):
+    # the hot table first, then the archived requests
+    for model in (BorrowRequestModel, BorrowRequestArchive):
+        yield from _request_rows(model, chunk_size)
+
+
+def _request_rows(model, chunk_size):
+    requests = model.objects.order_by('pk').select_related('book', 'borrower').only(
+        'status', 'overdue', 'request_date', 'approval_date', 'due_date', 'complete_date',
+        'book__isbn', 'book__title', 'borrower__username',
+    )
+    for request in requests.iterator(chunk_size=chunk_size):
+        yield {
+            'id': request.pk,
+            'status': request.get_status_display(),
+            'book_isbn': request.book.isbn,
+            'book_title': request.book.title,
+            'borrower': request.borrower.username if request.borrower else None,
+            'overdue': request.overdue,
+            'request_date': request.request_date,
+            'approval_date': request.approval_date,
+            'due_date': request.due_date,
+            'complete_date': request.complete_date,
+        }
+
+
+EXPORTS = {
+    'books': (book_rows, BOOK_FIELDS),
+    'requests': (request_rows, REQUEST_FIELDS),
+}
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows, fields):
+    writer = csv.writer(Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow([
+            LIST_SEPARATOR.join(row[field]) if isinstance(row[field], list) else row[field]
+            for field in fields
+        ])
+
+
+def jsonl_lines(rows, fields):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+
+def export_lines(dataset, file_format):
+    rows, fields = EXPORTS[dataset]
+    lines = csv_lines if file_format == 'csv' else jsonl_lines
+    return lines(rows(), fields)
+
+
+async def aiter_lines(lines, chunk_size=EXPORT_CHUNK_SIZE):
+    # under ASGI Django reads a sync iterator into a list before sending it;
+    # hand the lines over a chunk at a time instead, each pulled in the thread
+    # that holds the database cursor
+    next_chunk = sync_to_async(lambda: list(islice(lines, chunk_size)))
+    while chunk := await next_chunk():
+        yield ''.join(chunk)
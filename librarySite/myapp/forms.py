@@ -1,7 +1,9 @@
 from django import forms
 from django.utils import timezone
 
-from .models import Genre, Book, Author, UserProfile
+from .models import Genre, Book, Author, UserProfile, BorrowRequestModel
+from .throttle import login_throttle, login_throttle_keys
+from .widgets import AutocompleteSelect, AutocompleteSelectMultiple
 from django.contrib.auth import authenticate, get_user_model
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
@@ -23,9 +25,31 @@ class LoginViewForm(forms.Form):
         }
     ))
 
+    def __init__(self, *args, request=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.request = request
+        self.user_cache = None
+
     def clean(self):
-        if not authenticate(**self.cleaned_data):
+        username = self.cleaned_data.get('username')
+        password = self.cleaned_data.get('password')
+        if username is None or password is None:
+            return self.cleaned_data
+        # refuse throttled attempts before any password is hashed
+        keys = login_throttle_keys(self.request, username)
+        retry_after = login_throttle.retry_after(*keys)
+        if retry_after:
+            raise ValidationError(f'Too many failed login attempts. Try again in {retry_after} seconds.')
+        self.user_cache = authenticate(self.request, username=username, password=password)
+        if self.user_cache is None:
+            login_throttle.failed(*keys)
             raise ValidationError('Incorrect username or password.')
+        # only the account: the address may still be guessing at others
+        login_throttle.succeeded(keys[0])
+        return self.cleaned_data
+
+    def get_user(self):
+        return self.user_cache
 
 
 class RegisterViewForm(forms.Form):
@@ -241,21 +265,12 @@ class CreateNewBookForm(forms.Form):
             'class': 'form-control',
         }
     ))
-    genre = forms.ModelMultipleChoiceField(label='Genre', queryset=Genre.objects.all(), widget=forms.SelectMultiple(
-        attrs={
-            'class': 'form-control',
-        }
-    ))
-    authors = forms.ModelMultipleChoiceField(label='Authors', queryset=Author.objects.all(), widget=forms.SelectMultiple(
-        attrs={
-            'class': 'form-control',
-        }
-    ))
-    borrower = forms.ModelChoiceField(label='Borrower', queryset=UserProfile.objects.all(), required=False, widget=forms.Select(
-        attrs={
-            'class': 'form-control',
-        }
-    ))
+    genre = forms.ModelMultipleChoiceField(label='Genre', queryset=Genre.objects.all(),
+                                           widget=AutocompleteSelectMultiple('genre_autocomplete_view'))
+    authors = forms.ModelMultipleChoiceField(label='Authors', queryset=Author.objects.all(),
+                                             widget=AutocompleteSelectMultiple('author_autocomplete_view'))
+    borrower = forms.ModelChoiceField(label='Borrower', queryset=UserProfile.objects.all(), required=False,
+                                      widget=AutocompleteSelect('borrower_autocomplete_view'))
 
     def clean(self):
         title = self.cleaned_data['title']
@@ -284,7 +299,6 @@ class CreateNewBookForm(forms.Form):
 
         book.genre.set(genre)
         book.authors.set(authors)
-        book.save()
 
 
 class UpdateBookForm(forms.Form):
@@ -312,26 +326,51 @@ class UpdateBookForm(forms.Form):
             'class': 'form-control',
         }
     ))
-    genre = forms.ModelMultipleChoiceField(label='Genre', queryset=Genre.objects.all(), widget=forms.SelectMultiple(
+    genre = forms.ModelMultipleChoiceField(label='Genre', queryset=Genre.objects.all(),
+                                           widget=AutocompleteSelectMultiple('genre_autocomplete_view'))
+    authors = forms.ModelMultipleChoiceField(label='Authors', queryset=Author.objects.all(),
+                                             widget=AutocompleteSelectMultiple('author_autocomplete_view'))
+    borrower = forms.ModelChoiceField(label='Borrower', queryset=UserProfile.objects.all(), required=False,
+                                      widget=AutocompleteSelect('borrower_autocomplete_view'))
+
+    def clean(self):
+        title = self.cleaned_data['title']
+        if len(Book.objects.filter(title=title)):
+            self.add_error('title', 'Book with this title already exist.')
+        date = self.cleaned_data['published_date']
+        if date > timezone.now().date():
+            self.add_error('published_date', 'Unreal date for field "published date".')
+
+
+class RequestQueueFilterForm(forms.Form):
+    status = forms.TypedChoiceField(label='Status', required=False, coerce=int, empty_value=None,
+                                    choices=[('', 'All')] + BorrowRequestModel.status_choices,
+                                    widget=forms.HiddenInput())
+    date_from = forms.DateField(label='From', required=False, widget=forms.DateInput(
         attrs={
+            'type': 'date',
             'class': 'form-control',
         }
     ))
-    authors = forms.ModelMultipleChoiceField(label='Authors', queryset=Author.objects.all(), widget=forms.SelectMultiple(
+    date_to = forms.DateField(label='To', required=False, widget=forms.DateInput(
         attrs={
+            'type': 'date',
             'class': 'form-control',
         }
     ))
-    borrower = forms.ModelChoiceField(label='Borrower', queryset=UserProfile.objects.all(), required=False, widget=forms.Select(
+    borrower = forms.CharField(label='Borrower', required=False, widget=forms.TextInput(
         attrs={
+            'placeholder': 'Borrower username',
             'class': 'form-control',
         }
     ))
 
-    def clean(self):
-        title = self.cleaned_data['title']
-        if len(Book.objects.filter(title=title)):
-            self.add_error('title', 'Book with this title already exist.')
-        date = self.cleaned_data['published_date']
-        if date > timezone.now().date():
-            self.add_error('published_date', 'Unreal date for field "published date".')
+    def filter(self, queryset):
+        # every filter except the status, which the per-status counts are split by
+        if self.cleaned_data['date_from']:
+            queryset = queryset.filter(request_date__gte=self.cleaned_data['date_from'])
+        if self.cleaned_data['date_to']:
+            queryset = queryset.filter(request_date__lte=self.cleaned_data['date_to'])
+        if self.cleaned_data['borrower']:
+            queryset = queryset.filter(borrower__username__istartswith=self.cleaned_data['borrower'])
+        return queryset
@@ -0,0 +1,89 @@
+from django.http import Http404
+
+
+class RequestLoader:
+    """
+    Request-scoped identity map. Objects looked up by a natural key (isbn,
+    name, username) or by pk are fetched once and the same instance is
+    returned for the rest of the request; misses are remembered too, and a
+    missing object is a 404. Get the request's loader with get_loader(request).
+    """
+
+    def __init__(self):
+        self._objects = {}
+
+    @staticmethod
+    def _queryset(model_or_queryset):
+        if hasattr(model_or_queryset, '_default_manager'):
+            return model_or_queryset._default_manager.all()
+        return model_or_queryset
+
+    @staticmethod
+    def _key(model, field, value):
+        return model._meta.concrete_model, field, value
+
+    def _store(self, model, field, value, obj):
+        self._objects[self._key(model, field, value)] = obj
+        if obj is not None:
+            # found again by pk, e.g. as the borrower of a request
+            self._objects[self._key(model, 'pk', obj.pk)] = obj
+
+    def remember(self, obj, field):
+        self._store(obj._meta.model, field, getattr(obj, field), obj)
+        return obj
+
+    def _found(self, model, key):
+        obj = self._objects[key]
+        if obj is None:
+            raise Http404(f'No {model._meta.object_name} matching {key[1]}={key[2]!r}.')
+        return obj
+
+    def get(self, model_or_queryset, field, value):
+        queryset = self._queryset(model_or_queryset)
+        key = self._key(queryset.model, field, value)
+        if key not in self._objects:
+            self._store(queryset.model, field, value, queryset.filter(**{field: value}).first())
+        return self._found(queryset.model, key)
+
+    async def aget(self, model_or_queryset, field, value):
+        queryset = self._queryset(model_or_queryset)
+        key = self._key(queryset.model, field, value)
+        if key not in self._objects:
+            self._store(queryset.model, field, value, await queryset.filter(**{field: value}).afirst())
+        return self._found(queryset.model, key)
+
+    def _missing(self, queryset, field, values):
+        return {value for value in values if self._key(queryset.model, field, value) not in self._objects}
+
+    def _loaded(self, queryset, field, values, found):
+        by_value = {getattr(obj, field): obj for obj in found}
+        for value in values:
+            self._store(queryset.model, field, value, by_value.get(value))
+
+    def _many(self, queryset, field, values):
+        objects = {value: self._objects[self._key(queryset.model, field, value)] for value in values}
+        return {value: obj for value, obj in objects.items() if obj is not None}
+
+    def load_many(self, model_or_queryset, values, field='pk'):
+        # value -> object, the ones not loaded yet fetched in one query
+        queryset = self._queryset(model_or_queryset)
+        missing = self._missing(queryset, field, values)
+        if missing:
+            self._loaded(queryset, field, missing, queryset.filter(**{f'{field}__in': missing}))
+        return self._many(queryset, field, values)
+
+    async def aload_many(self, model_or_queryset, values, field='pk'):
+        queryset = self._queryset(model_or_queryset)
+        missing = self._missing(queryset, field, values)
+        if missing:
+            self._loaded(queryset, field, missing, [obj async for obj in queryset.filter(**{f'{field}__in': missing})])
+        return self._many(queryset, field, values)
+
+
+def get_loader(request):
+    if not hasattr(request, '_loader'):
+        request._loader = RequestLoader()
+        # the viewer is already loaded by the authentication middleware
+        if request.user.is_authenticated:
+            request._loader.remember(request.user, 'username')
+    return request._loader
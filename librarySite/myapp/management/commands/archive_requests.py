@@ -0,0 +1,72 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from myapp.models import BorrowRequestArchive, BorrowRequestModel, JobCheckpoint
+from myapp.versions import bump_version
+
+CHECKPOINT = 'archive_requests'
+REQUEST_RETENTION_DAYS = getattr(settings, 'REQUEST_RETENTION_DAYS', 180)
+ARCHIVE_FIELDS = [
+    'id', 'status', 'book_id', 'borrower_id', 'overdue',
+    'request_date', 'approval_date', 'due_date', 'complete_date',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Move complete and declined borrow requests older than the retention window into '
+        'BorrowRequestArchive, one batch per transaction. An interrupted run resumes after the '
+        'last archived id; meant to run nightly after sweep_overdue.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=REQUEST_RETENTION_DAYS,
+                            help='Keep finished requests this many days in the hot table.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now().date() - timedelta(days=options['days'])
+        # declined requests have no completion date, they finish when asked
+        finished = BorrowRequestModel.objects.filter(
+            Q(status=BorrowRequestModel.COMPLETE, complete_date__lt=cutoff)
+            | Q(status=BorrowRequestModel.DECLINED, request_date__lt=cutoff)
+        )
+        checkpoint, _ = JobCheckpoint.objects.get_or_create(name=CHECKPOINT)
+        last_id = int(checkpoint.position or 0)
+        archived = 0
+        while True:
+            with transaction.atomic():
+                rows = list(
+                    finished.filter(pk__gt=last_id).order_by('pk').values(*ARCHIVE_FIELDS)[:options['batch_size']]
+                )
+                if not rows:
+                    break
+                # a batch copied by a run that died before its delete is copied again
+                BorrowRequestArchive.objects.bulk_create(
+                    [BorrowRequestArchive(**row) for row in rows], ignore_conflicts=True,
+                )
+                ids = [row['id'] for row in rows]
+                # plain SQL: finished requests do not change any more, and
+                # delete() would fetch the rows again for the per-row signals
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f'DELETE FROM {BorrowRequestModel._meta.db_table} WHERE id IN ({", ".join(["%s"] * len(ids))})',
+                        ids,
+                    )
+                last_id = ids[-1]
+                checkpoint.position = str(last_id)
+                checkpoint.save()
+            archived += len(rows)
+            self.stdout.write(f'{archived} requests archived...')
+
+        # the next run starts over, requests finish in any id order
+        checkpoint.position = ''
+        checkpoint.save()
+        if archived:
+            bump_version('requests')
+        self.stdout.write(self.style.SUCCESS(f'{archived} requests archived.'))
@@ -0,0 +1,123 @@
+import random
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from myapp.models import Book, BorrowRequestModel, UserProfile
+
+SEED_PREFIX = 'bench-'
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a large borrow-request table and report query plans and timings of the borrow-request '
+        'hot paths without and with the BorrowRequestModel indexes. The indexes are dropped and '
+        're-created during the run, so point it at a scratch database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200000)
+        parser.add_argument('--users', type=int, default=5000)
+        parser.add_argument('--books', type=int, default=20000)
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--no-compare', action='store_true', help='Only measure with the indexes in place.')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded rows afterwards.')
+
+    def handle(self, *args, **options):
+        self.repeat = options['repeat']
+        random.seed(0)
+        self.seed(options['requests'], options['users'], options['books'])
+        try:
+            indexes = BorrowRequestModel._meta.indexes
+            if not options['no_compare']:
+                with connection.schema_editor() as editor:
+                    for index in indexes:
+                        editor.remove_index(BorrowRequestModel, index)
+                try:
+                    self.report('without indexes')
+                finally:
+                    with connection.schema_editor() as editor:
+                        for index in indexes:
+                            editor.add_index(BorrowRequestModel, index)
+            self.report('with indexes')
+        finally:
+            if not options['keep']:
+                self.cleanup()
+
+    def seed(self, requests, users, books):
+        self.stdout.write(f'Seeding {users} users, {books} books and {requests} borrow requests...')
+        UserProfile.objects.bulk_create(
+            [UserProfile(username=f'{SEED_PREFIX}{i}', password='!') for i in range(users)], batch_size=5000
+        )
+        Book.objects.bulk_create([
+            Book(title=f'{SEED_PREFIX}{i}', isbn=f'B{i:012}', summary='', publisher='', published_date=date(2000, 1, 1))
+            for i in range(books)
+        ], batch_size=5000)
+        self.user_ids = list(UserProfile.objects.filter(username__startswith=SEED_PREFIX).values_list('pk', flat=True))
+        self.book_ids = list(Book.objects.filter(title__startswith=SEED_PREFIX).values_list('pk', flat=True))
+
+        today = date.today()
+        statuses = [BorrowRequestModel.COMPLETE] * 80 + [BorrowRequestModel.DECLINED] * 10 + [
+            BorrowRequestModel.PENDING, BorrowRequestModel.APPROVED,
+        ] * 2 + [BorrowRequestModel.COLLECTED] * 6
+        batch = []
+        for _ in range(requests):
+            status = random.choice(statuses)
+            request_date = today - timedelta(days=random.randint(0, 3650))
+            batch.append(BorrowRequestModel(
+                status=status,
+                book_id=random.choice(self.book_ids),
+                borrower_id=random.choice(self.user_ids),
+                request_date=request_date,
+                due_date=request_date + timedelta(weeks=2) if status in (BorrowRequestModel.COLLECTED, BorrowRequestModel.COMPLETE) else None,
+            ))
+            if len(batch) == 5000:
+                BorrowRequestModel.objects.bulk_create(batch)
+                batch = []
+        BorrowRequestModel.objects.bulk_create(batch)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def queries(self):
+        borrower = random.choice(self.user_ids)
+        book = random.choice(self.book_ids)
+        requests = BorrowRequestModel.objects
+        return {
+            'pending requests (librarian profile)':
+                requests.filter(status=BorrowRequestModel.PENDING).order_by('request_date', 'id')[:50],
+            'requests of a borrower (profile)':
+                requests.filter(borrower_id=borrower),
+            'request for borrower and book (book detail)':
+                requests.filter(borrower_id=borrower, book_id=book)[:1],
+            'active loans of a borrower':
+                requests.filter(borrower_id=borrower, status__in=[BorrowRequestModel.APPROVED, BorrowRequestModel.COLLECTED]),
+        }
+
+    def report(self, label):
+        self.stdout.write(self.style.MIGRATE_HEADING(f'\n=== {label} ==='))
+        timings = {}
+        for _ in range(self.repeat):
+            for name, queryset in self.queries().items():
+                start = time.perf_counter()
+                list(queryset)
+                timings.setdefault(name, []).append((time.perf_counter() - start) * 1000)
+        for name, queryset in self.queries().items():
+            samples = timings[name]
+            self.stdout.write(self.style.SUCCESS(
+                f'{name}: median {statistics.median(samples):.3f} ms, max {max(samples):.3f} ms'
+            ))
+            self.stdout.write(queryset.explain())
+
+    def cleanup(self):
+        # plain SQL, per-object delete signals would dominate the run time
+        books = Book._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {BorrowRequestModel._meta.db_table} WHERE book_id IN '
+                f'(SELECT id FROM {books} WHERE title LIKE %s)', [f'{SEED_PREFIX}%']
+            )
+            cursor.execute(f'DELETE FROM {books} WHERE title LIKE %s', [f'{SEED_PREFIX}%'])
+        UserProfile.objects.filter(pk__in=self.user_ids).delete()
@@ -0,0 +1,113 @@
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher, make_password
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils.module_loading import import_string
+
+from myapp.forms import LoginViewForm
+from myapp.models import UserProfile
+from myapp.throttle import login_throttle, login_throttle_keys
+
+SEED_PREFIX = 'bench-login-'
+PASSWORD = 'benchmark-password'
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure login throughput for each of the configured PASSWORD_HASHERS: successful and failed '
+        'logins through LoginViewForm, one password hash each. A temporary user is created per hasher '
+        'and removed afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=20, help='Logins per hasher and outcome.')
+        parser.add_argument('--threads', type=int, default=1)
+
+    def handle(self, *args, **options):
+        self.logins = options['logins']
+        self.threads = max(1, options['threads'])
+        if connection.vendor == 'sqlite' and self.threads > 1:
+            self.stdout.write('SQLite database, running with one thread.')
+            self.threads = 1
+        results = {}
+        for path in settings.PASSWORD_HASHERS:
+            # make the measured hasher the preferred one, so a successful login
+            # does not upgrade the stored hash to another algorithm
+            with override_settings(PASSWORD_HASHERS=[path] + [p for p in settings.PASSWORD_HASHERS if p != path]):
+                results[path] = self.measure(path)
+        self.stdout.write(f'{"hasher":<60} {"outcome":<8} {"logins/s":>10} {"p50 ms":>10} {"p95 ms":>10}')
+        for path, outcomes in results.items():
+            if outcomes is None:
+                self.stdout.write(f'{path:<60} unavailable')
+                continue
+            for outcome, stats in outcomes.items():
+                self.stdout.write(
+                    f'{path:<60} {outcome:<8} {stats["rate"]:>10.1f} {stats["p50"]:>10.1f} {stats["p95"]:>10.1f}'
+                )
+
+    def measure(self, path):
+        algorithm = import_string(path).algorithm
+        try:
+            encoded = make_password(PASSWORD, hasher=get_hasher(algorithm))
+        except ValueError:
+            # the hasher's library is not installed
+            return None
+        username = f'{SEED_PREFIX}{algorithm}'
+        UserProfile.objects.filter(username=username).delete()
+        UserProfile.objects.create(username=username, password=encoded)
+        try:
+            return {
+                'success': self.run({'username': username, 'password': PASSWORD}, expect=True),
+                'failure': self.run({'username': username, 'password': PASSWORD + '-wrong'}, expect=False),
+            }
+        finally:
+            UserProfile.objects.filter(username=username).delete()
+
+    def run(self, data, expect):
+        durations, errors = [], []
+        lock = threading.Lock()
+        per_thread = max(1, self.logins // self.threads)
+
+        def worker():
+            try:
+                for _ in range(per_thread):
+                    form = LoginViewForm(data)
+                    start = time.perf_counter()
+                    valid = form.is_valid()
+                    elapsed = time.perf_counter() - start
+                    if valid != expect:
+                        raise RuntimeError(f'Unexpected login result: {form.errors.as_text()}')
+                    if not valid:
+                        # measure the hash, not the throttle's refusals
+                        login_throttle.succeeded(*login_throttle_keys(None, data['username']))
+                    with lock:
+                        durations.append(elapsed)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                if self.threads > 1:
+                    connection.close()
+
+        started = time.perf_counter()
+        if self.threads == 1:
+            worker()
+        else:
+            threads = [threading.Thread(target=worker) for _ in range(self.threads)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        wall = time.perf_counter() - started
+        if errors:
+            raise errors[0]
+        durations.sort()
+        return {
+            'rate': len(durations) / wall,
+            'p50': statistics.median(durations) * 1000,
+            'p95': durations[min(len(durations) - 1, int(len(durations) * 0.95))] * 1000,
+        }
@@ -0,0 +1,65 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from myapp.models import BookRecommendation, CoBorrowCount, JobCheckpoint
+from myapp.recommendations import (
+    add_counts, baskets, completed_loans, count_new_pairs, count_pairs, refresh_recommendations,
+)
+from myapp.versions import bump_version
+
+CHECKPOINT = 'build_recommendations'
+
+
+class Command(BaseCommand):
+    help = (
+        'Maintain the co-borrow counts and the top-K "readers also borrowed" table from completed '
+        'loans. The first run (or --rebuild) counts every loan; later runs only add the loans '
+        'returned since the last run, up to yesterday. Meant to run nightly.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='Recount every completed loan.')
+
+    def handle(self, *args, **options):
+        # returns are dated the day they happen, so a finished day never changes
+        yesterday = timezone.now().date() - timedelta(days=1)
+        checkpoint, _ = JobCheckpoint.objects.get_or_create(name=CHECKPOINT)
+        if options['rebuild'] or not checkpoint.position:
+            self.rebuild(checkpoint, yesterday)
+        else:
+            first_day = date.fromisoformat(checkpoint.position) + timedelta(days=1)
+            if first_day <= yesterday:
+                self.update(checkpoint, first_day, yesterday)
+        self.stdout.write(self.style.SUCCESS(f'Recommendations up to date until {checkpoint.position}.'))
+
+    def rebuild(self, checkpoint, last_day):
+        counts = count_pairs(baskets(completed_loans(complete_date__lte=last_day)))
+        with transaction.atomic():
+            CoBorrowCount.objects.all().delete()
+            BookRecommendation.objects.all().delete()
+            CoBorrowCount.objects.bulk_create(
+                [CoBorrowCount(book_id=book_id, other_id=other_id, count=count)
+                 for (book_id, other_id), count in counts.items()],
+                batch_size=1000,
+            )
+            refresh_recommendations({book_id for book_id, _ in counts})
+            checkpoint.position = last_day.isoformat()
+            checkpoint.save()
+        bump_version('recommendations')
+        self.stdout.write(f'Counted {len(counts)} book pairs.')
+
+    def update(self, checkpoint, first_day, last_day):
+        new = baskets(completed_loans(complete_date__range=(first_day, last_day)))
+        history = baskets(completed_loans(borrower_id__in=list(new), complete_date__lt=first_day))
+        counts = count_new_pairs(new, history)
+        with transaction.atomic():
+            changed = add_counts(counts)
+            refresh_recommendations(changed)
+            checkpoint.position = last_day.isoformat()
+            checkpoint.save()
+        if changed:
+            bump_version('recommendations')
+        self.stdout.write(f'Added {len(counts)} book pair counts, {len(changed)} books refreshed.')
@@ -0,0 +1,22 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from myapp.exports import CONTENT_TYPES, EXPORTS, export_lines
+
+
+class Command(BaseCommand):
+    help = 'Stream a full export of books or borrow requests as CSV or JSON Lines.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(EXPORTS))
+        parser.add_argument('--format', choices=sorted(CONTENT_TYPES), default='csv')
+        parser.add_argument('--output', help='Output file, defaults to stdout.')
+
+    def handle(self, *args, **options):
+        lines = export_lines(options['dataset'], options['format'])
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+                output.writelines(lines)
+        else:
+            sys.stdout.writelines(lines)
@@ -0,0 +1,185 @@
+import csv
+import json
+from datetime import date
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+
+from myapp.models import Author, Book, Genre
+from myapp.search import refresh_search_vectors
+from myapp.signals import touch
+from myapp.versions import bump_version
+
+FORMATS = ('csv', 'jsonl')
+
+
+class Command(BaseCommand):
+    help = (
+        'Bulk import books from a CSV or JSON Lines file. Each record has title, summary, isbn, '
+        'published_date (YYYY-MM-DD), publisher, authors and genres; in CSV the author and genre '
+        'lists are joined with --list-separator.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=FORMATS, help='Defaults to the file extension.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--list-separator', default='|')
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        file_format = options['format'] or path.suffix.lstrip('.').lower()
+        if file_format not in FORMATS:
+            raise CommandError(f'Cannot infer the format of {path}, pass --format {"/".join(FORMATS)}.')
+        self.batch_size = options['batch_size']
+        self.separator = options['list_separator']
+
+        self.author_ids = dict(Author.objects.values_list('name', 'pk'))
+        self.genre_ids = dict(Genre.objects.values_list('name', 'pk'))
+        self.seen_isbns = set()
+        self.seen_titles = set()
+        self.imported = self.skipped = 0
+
+        with path.open(newline='', encoding='utf-8') as stream:
+            records = self.read_csv(stream) if file_format == 'csv' else self.read_jsonl(stream)
+            batch = []
+            for line, record in records:
+                book = self.parse(line, record)
+                if book is not None:
+                    batch.append(book)
+                if len(batch) >= self.batch_size:
+                    self.flush(batch)
+                    batch = []
+            self.flush(batch)
+
+        bump_version('navigation', 'catalog')
+        self.stdout.write(self.style.SUCCESS(f'Imported {self.imported} books, skipped {self.skipped}.'))
+
+    def read_csv(self, stream):
+        for line, row in enumerate(csv.DictReader(stream), start=2):
+            yield line, row
+
+    def read_jsonl(self, stream):
+        for line, text in enumerate(stream, start=1):
+            if not text.strip():
+                continue
+            try:
+                yield line, json.loads(text)
+            except ValueError as error:
+                self.skip(line, f'invalid JSON ({error})')
+
+    def split(self, value):
+        if isinstance(value, str):
+            value = value.split(self.separator)
+        return [name.strip() for name in value or [] if name and name.strip()]
+
+    def parse(self, line, record):
+        if not isinstance(record, dict):
+            self.skip(line, 'malformed record (not an object)')
+            return None
+        try:
+            title = record['title'].strip()
+            isbn = record['isbn'].strip()
+            book = {
+                'line': line,
+                'title': title,
+                'isbn': isbn,
+                'summary': record.get('summary') or '',
+                'publisher': record['publisher'].strip(),
+                'published_date': date.fromisoformat(str(record['published_date']).strip()),
+                'authors': self.split(record.get('authors')),
+                'genres': self.split(record.get('genres')),
+            }
+        except (KeyError, AttributeError, TypeError, ValueError) as error:
+            self.skip(line, f'malformed record ({error!r})')
+            return None
+
+        if not title or not isbn or len(isbn) > 13 or len(title) > 255:
+            self.skip(line, 'missing or too long title/isbn')
+        elif not book['publisher'] or len(book['publisher']) > 255:
+            self.skip(line, 'missing or too long publisher')
+        elif not book['authors']:
+            self.skip(line, 'no authors')
+        elif any(len(name) > 64 for name in book['authors']):
+            self.skip(line, 'author name longer than 64 characters')
+        elif isbn in self.seen_isbns:
+            self.skip(line, f'duplicate ISBN {isbn} in file')
+        elif title in self.seen_titles:
+            self.skip(line, f'duplicate title "{title}" in file')
+        else:
+            self.seen_isbns.add(isbn)
+            self.seen_titles.add(title)
+            return book
+        return None
+
+    def skip(self, line, reason):
+        self.skipped += 1
+        self.stderr.write(f'line {line}: skipped, {reason}')
+
+    def flush(self, batch):
+        if not batch:
+            return
+        existing = set(Book.objects.filter(
+            Q(isbn__in=[book['isbn'] for book in batch]) | Q(title__in=[book['title'] for book in batch])
+        ).values_list('isbn', 'title'))
+        existing_isbns = {isbn for isbn, _ in existing}
+        existing_titles = {title for _, title in existing}
+
+        rows = []
+        for book in batch:
+            if book['isbn'] in existing_isbns:
+                self.skip(book['line'], f'ISBN {book["isbn"]} already in catalog')
+            elif book['title'] in existing_titles:
+                self.skip(book['line'], f'title "{book["title"]}" already in catalog')
+            else:
+                rows.append(book)
+        if not rows:
+            return
+
+        with transaction.atomic():
+            self.resolve(Author, self.author_ids, {name for book in rows for name in book['authors']}, bio='')
+            self.resolve(Genre, self.genre_ids, {name for book in rows for name in book['genres']})
+            books = Book.objects.bulk_create([
+                Book(
+                    title=book['title'],
+                    isbn=book['isbn'],
+                    summary=book['summary'],
+                    publisher=book['publisher'],
+                    published_date=book['published_date'],
+                    available=True,
+                    author_names=sorted(set(book['authors'])),
+                    genre_names=sorted(set(book['genres'])),
+                )
+                for book in rows
+            ], batch_size=self.batch_size)
+            if books and books[0].pk is None:
+                book_ids = dict(Book.objects.filter(isbn__in=[book['isbn'] for book in rows]).values_list('isbn', 'pk'))
+            else:
+                book_ids = {book.isbn: book.pk for book in books}
+
+            Book.authors.through.objects.bulk_create([
+                Book.authors.through(book_id=book_ids[book['isbn']], author_id=self.author_ids[name])
+                for book in rows for name in set(book['authors'])
+            ], batch_size=self.batch_size)
+            Book.genre.through.objects.bulk_create([
+                Book.genre.through(book_id=book_ids[book['isbn']], genre_id=self.genre_ids[name])
+                for book in rows for name in set(book['genres'])
+            ], batch_size=self.batch_size)
+            refresh_search_vectors(Book.objects.filter(pk__in=book_ids.values()))
+            # existing authors and genres now list more books
+            touch(Author.objects.filter(pk__in={self.author_ids[name] for book in rows for name in book['authors']}))
+            touch(Genre.objects.filter(pk__in={self.genre_ids[name] for book in rows for name in book['genres']}))
+
+        self.imported += len(rows)
+        self.stdout.write(f'{self.imported} books imported')
+
+    def resolve(self, model, ids, names, **defaults):
+        missing = [name for name in names if name not in ids]
+        if not missing:
+            return
+        created = model.objects.bulk_create([model(name=name, **defaults) for name in missing], batch_size=self.batch_size)
+        if created and created[0].pk is None:
+            created = model.objects.filter(name__in=missing)
+        ids.update((obj.name, obj.pk) for obj in created)
@@ -0,0 +1,294 @@
+import json
+import random
+import statistics
+import threading
+import time
+import traceback
+from datetime import date
+from http.cookies import SimpleCookie
+from io import BytesIO
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.urls import reverse
+
+from myapp.models import Author, Book, BorrowRequestModel, Genre, UserProfile
+from myapp.search import refresh_search_vectors
+from myapp.summaries import refresh_name_summaries
+
+PASSWORD = 'loadtest-password'
+
+# scenario -> weight; every scenario starts from a fresh visitor with no cookies
+MIX = {
+    'browse': 50,
+    'book_detail': 30,
+    'login': 8,
+    'borrow': 8,
+    'approve': 4,
+}
+
+
+class WSGIClient:
+    """Drives a WSGI application in-process, keeping cookies like a browser."""
+
+    def __init__(self, application):
+        self.application = application
+        self.cookies = SimpleCookie()
+
+    def request(self, method, url, data=None):
+        parts = urlsplit(url)
+        body = urlencode(data or {}).encode()
+        environ = {
+            'REQUEST_METHOD': method,
+            'PATH_INFO': parts.path,
+            'QUERY_STRING': parts.query,
+            'SERVER_NAME': 'testserver',
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_HOST': 'testserver',
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': BytesIO(body),
+            'wsgi.errors': BytesIO(),
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        if self.cookies:
+            environ['HTTP_COOKIE'] = '; '.join(f'{key}={morsel.value}' for key, morsel in self.cookies.items())
+        if method == 'POST':
+            environ['CONTENT_TYPE'] = 'application/x-www-form-urlencoded'
+            environ['CONTENT_LENGTH'] = str(len(body))
+
+        status = []
+
+        def start_response(status_line, headers, exc_info=None):
+            status.append(int(status_line.split()[0]))
+            for name, value in headers:
+                if name.lower() == 'set-cookie':
+                    self.cookies.load(value)
+
+        result = self.application(environ, start_response)
+        try:
+            for _ in result:
+                pass
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        return status[0]
+
+
+class Command(BaseCommand):
+    help = (
+        'Replay a weighted mix of anonymous browsing, logins, borrow requests and librarian approvals '
+        'against librarySite.wsgi.application in-process, on a freshly created test database, and '
+        'print latency percentiles, throughput and queries per request as JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Scenarios to run, after the warm-up.')
+        parser.add_argument('--warmup', type=int, default=100)
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--books', type=int, default=500)
+        parser.add_argument('--readers', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout.')
+        parser.add_argument('--keepdb', action='store_true', help='Reuse the test database between runs.')
+
+    def handle(self, *args, **options):
+        # run the way production does, not with per-query debug logging
+        settings.DEBUG = False
+        settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, 'testserver']
+        concurrency = options['concurrency']
+        if not connection.features.test_db_allows_multiple_connections:
+            self.stderr.write('The test database does not allow several connections, running with concurrency 1.')
+            concurrency = 1
+
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            from librarySite.wsgi import application
+
+            self.application = application
+            self.seed_data(options['books'], options['readers'])
+            self.samples = []
+            self.errors = []
+            self.lock = threading.Lock()
+
+            self.run(options['warmup'], concurrency, options['seed'] + 1)
+            self.samples = []
+            started = time.perf_counter()
+            self.run(options['requests'], concurrency, options['seed'])
+            elapsed = time.perf_counter() - started
+
+            report = self.report(elapsed, options, concurrency)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as stream:
+                stream.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+    def seed_data(self, books, readers):
+        # idempotent, so that --keepdb runs start from the same catalog
+        BorrowRequestModel.objects.all().delete()
+        if Book.objects.count() < books:
+            Author.objects.bulk_create([Author(name=f'Author {i}', bio='') for i in range(max(books // 10, 1))])
+            Genre.objects.bulk_create([Genre(name=f'Genre {i}') for i in range(10)])
+            Book.objects.bulk_create([
+                Book(title=f'Book {i}', isbn=f'L{i:012}', summary='Lorem ipsum ' * 20, publisher='Load',
+                     published_date=date(2000, 1, 1))
+                for i in range(books)
+            ])
+            author_ids = list(Author.objects.values_list('pk', flat=True))
+            genre_ids = list(Genre.objects.values_list('pk', flat=True))
+            book_ids = list(Book.objects.values_list('pk', flat=True))
+            Book.authors.through.objects.bulk_create([
+                Book.authors.through(book_id=pk, author_id=author_ids[i % len(author_ids)]) for i, pk in enumerate(book_ids)
+            ])
+            Book.genre.through.objects.bulk_create([
+                Book.genre.through(book_id=pk, genre_id=genre_ids[i % len(genre_ids)]) for i, pk in enumerate(book_ids)
+            ])
+            refresh_search_vectors(Book.objects.all())
+            refresh_name_summaries(Book.objects.all())
+        Book.objects.update(available=True)
+        self.isbns = list(Book.objects.order_by('pk').values_list('isbn', flat=True)[:books])
+
+        # hash once, a fresh salt per user would only slow down the seeding
+        password = make_password(PASSWORD)
+        UserProfile.objects.filter(username__startswith='loadtest-').delete()
+        UserProfile.objects.bulk_create(
+            [UserProfile(username=f'loadtest-reader-{i}', password=password) for i in range(readers)]
+            + [UserProfile(username='loadtest-librarian', password=password, is_librarian=True)]
+        )
+        self.readers = [f'loadtest-reader-{i}' for i in range(readers)]
+
+    def run(self, total, concurrency, seed):
+        scenarios, weights = zip(*MIX.items())
+        plan = random.Random(seed).choices(scenarios, weights=weights, k=total)
+        chunks = [plan[i::concurrency] for i in range(concurrency)]
+        threads = [
+            threading.Thread(target=self.worker, args=(chunk, random.Random(seed * 1000 + i)))
+            for i, chunk in enumerate(chunks)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if self.errors:
+            # a report of the scenarios that did not break would not compare
+            # with other runs
+            scenario, error = self.errors[0]
+            raise CommandError(
+                f'{len(self.errors)} scenarios failed, the first ({scenario}) with:\n'
+                + ''.join(traceback.format_exception(error))
+            )
+
+    def worker(self, plan, rng):
+        try:
+            for scenario in plan:
+                client = WSGIClient(self.application)
+                try:
+                    getattr(self, f'scenario_{scenario}')(client, rng)
+                except Exception as error:
+                    with self.lock:
+                        self.errors.append((scenario, error))
+        finally:
+            connection.close()
+
+    def hit(self, client, name, method, url, data=None):
+        queries = []
+
+        def count(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count):
+            start = time.perf_counter()
+            status = client.request(method, url, data)
+            elapsed = time.perf_counter() - start
+        with self.lock:
+            self.samples.append((name, elapsed * 1000, len(queries), status >= 400))
+        return status
+
+    def login(self, client, username):
+        url = reverse('login_view')
+        self.hit(client, 'login_form', 'GET', url)
+        self.hit(client, 'login', 'POST', url, {
+            'username': username,
+            'password': PASSWORD,
+            'csrfmiddlewaretoken': client.cookies[settings.CSRF_COOKIE_NAME].value,
+        })
+
+    def scenario_browse(self, client, rng):
+        self.hit(client, 'main', 'GET', reverse('main_view'))
+
+    def scenario_book_detail(self, client, rng):
+        self.hit(client, 'book_detail', 'GET', reverse('book_detail_view', args=[rng.choice(self.isbns)]))
+
+    def scenario_login(self, client, rng):
+        self.login(client, rng.choice(self.readers))
+
+    def scenario_borrow(self, client, rng):
+        self.login(client, rng.choice(self.readers))
+        isbn = rng.choice(self.isbns)
+        self.hit(client, 'book_detail', 'GET', reverse('book_detail_view', args=[isbn]))
+        self.hit(client, 'borrow', 'GET', reverse('create_borrow_request_view', args=[isbn]))
+
+    def scenario_approve(self, client, rng):
+        self.login(client, 'loadtest-librarian')
+        pending = list(
+            BorrowRequestModel.objects.filter(status=BorrowRequestModel.PENDING).values_list('pk', flat=True)[:20]
+        )
+        if pending:
+            self.hit(client, 'approve', 'GET', reverse('request_approve_view', args=[rng.choice(pending)]))
+
+    def report(self, elapsed, options, concurrency):
+        endpoints = {}
+        for name, latency, queries, failed in self.samples:
+            endpoints.setdefault(name, []).append((latency, queries, failed))
+        return {
+            'database': connection.vendor,
+            'options': {
+                'requests': options['requests'],
+                'concurrency': concurrency,
+                'books': options['books'],
+                'readers': options['readers'],
+                'seed': options['seed'],
+                'mix': MIX,
+            },
+            'duration_s': round(elapsed, 3),
+            'requests_per_s': round(len(self.samples) / elapsed, 2) if elapsed else None,
+            'total': self.summarize([(latency, queries, failed) for _, latency, queries, failed in self.samples]),
+            'endpoints': {name: self.summarize(samples) for name, samples in sorted(endpoints.items())},
+        }
+
+    @staticmethod
+    def summarize(samples):
+        latencies = sorted(latency for latency, _, _ in samples)
+        queries = [count for _, count, _ in samples]
+        if len(latencies) > 1:
+            cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+            p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+        else:
+            p50 = p95 = p99 = latencies[0] if latencies else None
+        return {
+            'requests': len(samples),
+            'errors': sum(failed for _, _, failed in samples),
+            'latency_ms': {
+                'p50': p50 and round(p50, 3),
+                'p95': p95 and round(p95, 3),
+                'p99': p99 and round(p99, 3),
+                'mean': round(statistics.fmean(latencies), 3) if latencies else None,
+                'max': round(latencies[-1], 3) if latencies else None,
+            },
+            'queries_per_request': {
+                'mean': round(statistics.fmean(queries), 2) if queries else None,
+                'max': max(queries, default=None),
+            },
+        }
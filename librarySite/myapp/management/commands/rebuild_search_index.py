@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from myapp.models import Book
+from myapp.search import refresh_search_vectors, uses_full_text_search
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored full-text search vector of every book in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if not uses_full_text_search():
+            self.stdout.write('The configured database has no full-text search, nothing to rebuild.')
+            return
+        batch_size = options['batch_size']
+        last_pk = 0
+        total = 0
+        while True:
+            pks = list(Book.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                break
+            refresh_search_vectors(Book.objects.filter(pk__in=pks))
+            last_pk = pks[-1]
+            total += len(pks)
+            self.stdout.write(f'{total} books indexed')
+        self.stdout.write(self.style.SUCCESS(f'Search index rebuilt for {total} books.'))
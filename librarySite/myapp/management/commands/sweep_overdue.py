@@ -0,0 +1,39 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from myapp.models import BorrowRequestModel, JobCheckpoint
+from myapp.versions import bump_version
+
+CHECKPOINT = 'sweep_overdue'
+
+
+class Command(BaseCommand):
+    help = (
+        'Flag collected loans past their due date as overdue with a single UPDATE. Meant to run '
+        'nightly (e.g. cron "15 2 * * * manage.py sweep_overdue"); each run only looks at due dates '
+        'since the previous run.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Ignore the checkpoint and scan every open loan.')
+
+    def handle(self, *args, **options):
+        today = timezone.now().date()
+        with transaction.atomic():
+            checkpoint, _ = JobCheckpoint.objects.select_for_update().get_or_create(name=CHECKPOINT)
+            loans = BorrowRequestModel.objects.filter(
+                status=BorrowRequestModel.COLLECTED, overdue=False, due_date__lt=today,
+            )
+            # loans due before the last run were flagged by it: due dates are
+            # set in the future when a book is collected and never move back
+            if checkpoint.position and not options['full']:
+                loans = loans.filter(due_date__gte=date.fromisoformat(checkpoint.position))
+            flagged = loans.update(overdue=True)
+            checkpoint.position = today.isoformat()
+            checkpoint.save()
+        if flagged:
+            bump_version('requests')
+        self.stdout.write(self.style.SUCCESS(f'{flagged} loans flagged as overdue.'))
@@ -0,0 +1,78 @@
+import base64
+import hashlib
+import re
+import urllib.request
+from pathlib import Path
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+# third-party assets served from myapp/static instead of a CDN:
+# static path -> (CDN copy, its subresource integrity hash)
+VENDOR_ASSETS = {
+    'myapp/vendor/bootstrap/bootstrap.min.css': (
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/css/bootstrap.min.css',
+        'sha384-QWTKZyjpPEjISv5WaRU9OFeRpok6YctnYmDr5pNlyT2bRjXh0JMhjY6hW+ALEwIH',
+    ),
+    'myapp/vendor/bootstrap/bootstrap.bundle.min.js': (
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/js/bootstrap.bundle.min.js',
+        'sha384-YvpcrYf0tY3lHB60NNkmXc5s9fDVZLESaAA55NDzOxhy9GkcIdslK1eN7N6jIeHz',
+    ),
+}
+
+# the source maps are not vendored, and collectstatic fails on a reference to
+# a file it cannot find
+SOURCE_MAP_COMMENT = re.compile(rb'\n?/[/*]# sourceMappingURL=\S+(?: \*/)?\s*$')
+
+
+def integrity_of(content, algorithm='sha384'):
+    return f'{algorithm}-{base64.b64encode(hashlib.new(algorithm, content).digest()).decode()}'
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy the third-party assets in VENDOR_ASSETS into myapp/static, checked against their '
+        'subresource integrity hashes, from the CDN or, offline, from a directory holding the same '
+        'files (e.g. node_modules/bootstrap/dist). Run when a version changes and commit the files.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', help='Directory searched for the files instead of downloading them.')
+        parser.add_argument('--force', action='store_true', help='Replace assets that are already vendored.')
+
+    def handle(self, *args, **options):
+        static_dir = Path(apps.get_app_config('myapp').path) / 'static'
+        for path, (url, integrity) in VENDOR_ASSETS.items():
+            target = static_dir / path
+            if target.exists() and not options['force']:
+                self.stdout.write(f'{path} already vendored.')
+                continue
+            if options['source']:
+                origin, content = self.find(Path(options['source']), url.rsplit('/', 1)[1], integrity)
+            else:
+                origin, content = url, self.download(url)
+            if integrity_of(content, integrity.split('-', 1)[0]) != integrity:
+                raise CommandError(f'{origin} does not match its integrity hash {integrity}.')
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_bytes(SOURCE_MAP_COMMENT.sub(b'\n', content))
+            self.stdout.write(self.style.SUCCESS(f'{origin} -> {path}'))
+
+    @staticmethod
+    def download(url):
+        try:
+            with urllib.request.urlopen(url, timeout=30) as response:
+                return response.read()
+        except OSError as error:
+            raise CommandError(f'Cannot download {url}: {error}')
+
+    @staticmethod
+    def find(source, filename, integrity):
+        # the first copy with the pinned content, the tree may hold other versions
+        candidates = sorted(source.rglob(filename))
+        for candidate in candidates:
+            content = candidate.read_bytes()
+            if integrity_of(content, integrity.split('-', 1)[0]) == integrity:
+                return candidate, content
+        if not candidates:
+            raise CommandError(f'No {filename} under {source}.')
+        return candidates[0], candidates[0].read_bytes()
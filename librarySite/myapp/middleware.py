@@ -0,0 +1,125 @@
+import json
+import logging
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('myapp.timing')
+
+
+class QueryRecorder:
+    def __init__(self):
+        self.queries = []
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.queries.append((sql, repr(params)))
+
+    def duplicates(self):
+        # repeats of identical SQL and parameters, e.g. the same object fetched twice
+        repeats = Counter()
+        for (sql, _), count in Counter(self.queries).items():
+            repeats[sql] += count - 1
+        return +repeats
+
+    def similar(self):
+        # repeats of the same SQL with any parameters, the N+1 pattern
+        return +Counter({sql: count - 1 for sql, count in Counter(sql for sql, _ in self.queries).items()})
+
+
+class RequestTimingMiddleware:
+    """
+    Opt-in with REQUEST_TIMING = True. Measures the queries and database time,
+    the deferred template rendering and the total time of every request and
+    reports them in a Server-Timing header and one JSON log line on the
+    'myapp.timing' logger. Repeated queries are logged as a warning.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_TIMING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        request._timing = {'template': 0.0}
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            self.record_queries(stack, recorder)
+            response = self.get_response(request)
+        return self.report(request, response, recorder, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder()
+        request._timing = {'template': 0.0}
+        start = time.perf_counter()
+        # the ORM calls of an async request run in its thread-sensitive worker
+        # thread, whose connections are the ones to wrap
+        stack = ExitStack()
+        await sync_to_async(self.record_queries)(stack, recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self.report(request, response, recorder, time.perf_counter() - start)
+
+    @staticmethod
+    def record_queries(stack, recorder):
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+
+    def report(self, request, response, recorder, total):
+        duplicates, similar = recorder.duplicates(), recorder.similar()
+        timings = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 2),
+            'db_ms': round(recorder.duration * 1000, 2),
+            'template_ms': round(request._timing['template'] * 1000, 2),
+            'queries': len(recorder.queries),
+            'duplicate_queries': sum(duplicates.values()),
+            'similar_queries': sum(similar.values()),
+        }
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={timings["db_ms"]};desc="{timings["queries"]} queries"',
+            f'tpl;dur={timings["template_ms"]}',
+            f'total;dur={timings["total_ms"]}',
+        ])
+        logger.info(json.dumps(timings))
+        if similar:
+            logger.warning(json.dumps({
+                'path': request.path,
+                'repeated_queries': [
+                    {'sql': sql[:300], 'repeats': repeats, 'identical': duplicates[sql]}
+                    for sql, repeats in similar.most_common()
+                ],
+            }))
+        return response
+
+    def process_template_response(self, request, response):
+        # called right before a TemplateResponse is rendered
+        started = time.perf_counter()
+
+        def rendered(response):
+            request._timing['template'] += time.perf_counter() - started
+
+        response.add_post_render_callback(rendered)
+        return response
@@ -0,0 +1,46 @@
+from django.db import migrations, transaction, DatabaseError
+
+# (index prefix, table, column) looked up by the autocomplete endpoints
+LOOKUP_COLUMNS = [
+    ('myapp_author_name', 'myapp_author', 'name'),
+    ('myapp_genre_name', 'myapp_genre', 'name'),
+    ('myapp_userprofile_username', 'myapp_userprofile', 'username'),
+]
+
+
+def create_lookup_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for prefix, table, column in LOOKUP_COLUMNS:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {prefix}_upper_like ON {table} (UPPER({column}::text) text_pattern_ops)'
+        )
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    except DatabaseError:
+        # pg_trgm is optional, lookups fall back to prefix matching only
+        return
+    for prefix, table, column in LOOKUP_COLUMNS:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {prefix}_trgm ON {table} USING gin ({column} gin_trgm_ops)'
+        )
+
+
+def drop_lookup_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for prefix, table, column in LOOKUP_COLUMNS:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {prefix}_upper_like')
+        schema_editor.execute(f'DROP INDEX IF EXISTS {prefix}_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0005_book_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_lookup_indexes, drop_lookup_indexes),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.4 on 2026-10-17 19:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0007_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='borrowrequestmodel',
+            index=models.Index(fields=['borrower', 'book'], name='borrowreq_borrower_book_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='borrowrequestmodel',
+            index=models.Index(condition=models.Q(('status', 1)), fields=['request_date', 'id'], name='borrowreq_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='borrowrequestmodel',
+            index=models.Index(condition=models.Q(('status__in', [2, 3])), fields=['borrower', 'due_date'], name='borrowreq_active_loans_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.4 on 2026-10-17 19:49
+
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.db.models import Max, Min
+
+# books per round, by pk range, so the names in memory stay bounded
+BATCH_SIZE = 2000
+
+
+def fill_name_summaries(apps, schema_editor):
+    Book = apps.get_model('myapp', 'Book')
+    bounds = Book.objects.aggregate(first=Min('pk'), last=Max('pk'))
+    if bounds['first'] is None:
+        return
+    for start in range(bounds['first'], bounds['last'] + 1, BATCH_SIZE):
+        in_batch = {'book_id__gte': start, 'book_id__lt': start + BATCH_SIZE}
+        authors, genres = defaultdict(list), defaultdict(list)
+        for book_id, name in Book.authors.through.objects.filter(**in_batch).values_list('book_id', 'author__name'):
+            authors[book_id].append(name)
+        for book_id, name in Book.genre.through.objects.filter(**in_batch).values_list('book_id', 'genre__name'):
+            genres[book_id].append(name)
+        # books without links keep the default empty lists
+        Book.objects.bulk_update([
+            Book(pk=pk, author_names=sorted(authors[pk]), genre_names=sorted(genres[pk]))
+            for pk in authors.keys() | genres.keys()
+        ], ['author_names', 'genre_names'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0009_overdue_sweep'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='author_names',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='genre_names',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.RunPython(fill_name_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.4 on 2026-10-17 19:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0010_book_name_summaries'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='borrowrequestmodel',
+            index=models.Index(fields=['request_date', 'id'], name='borrowreq_queue_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.4 on 2026-10-17 20:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0011_request_queue_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BorrowRequestArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('status', models.PositiveSmallIntegerField(choices=[(4, 'Complete'), (5, 'Declined')])),
+                ('overdue', models.BooleanField(default=False)),
+                ('request_date', models.DateField()),
+                ('approval_date', models.DateField(blank=True, null=True)),
+                ('due_date', models.DateField(blank=True, null=True)),
+                ('complete_date', models.DateField(blank=True, null=True)),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='myapp.book')),
+                ('borrower', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['borrower', 'request_date', 'id'], name='borrowarch_borrower_idx'), models.Index(fields=['request_date', 'id'], name='borrowarch_queue_idx')],
+            },
+        ),
+    ]
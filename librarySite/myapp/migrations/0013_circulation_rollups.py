@@ -0,0 +1,79 @@
+# Generated by Django 4.2.4 on 2026-10-17 20:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0012_borrow_request_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorCirculation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('loans', models.PositiveIntegerField(default=0)),
+                ('overdue', models.PositiveIntegerField(default=0)),
+                ('loan_days', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='BookCirculation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('loans', models.PositiveIntegerField(default=0)),
+                ('overdue', models.PositiveIntegerField(default=0)),
+                ('loan_days', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='GenreCirculation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('loans', models.PositiveIntegerField(default=0)),
+                ('overdue', models.PositiveIntegerField(default=0)),
+                ('loan_days', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='borrowrequestarchive',
+            index=models.Index(condition=models.Q(('status', 4)), fields=['complete_date'], name='borrowarch_completed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='borrowrequestmodel',
+            index=models.Index(condition=models.Q(('status', 4)), fields=['complete_date'], name='borrowreq_completed_idx'),
+        ),
+        migrations.AddField(
+            model_name='genrecirculation',
+            name='genre',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='myapp.genre'),
+        ),
+        migrations.AddField(
+            model_name='bookcirculation',
+            name='book',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='myapp.book'),
+        ),
+        migrations.AddField(
+            model_name='authorcirculation',
+            name='author',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='myapp.author'),
+        ),
+        migrations.AddConstraint(
+            model_name='genrecirculation',
+            constraint=models.UniqueConstraint(fields=('day', 'genre'), name='genrecirc_day_genre_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='bookcirculation',
+            constraint=models.UniqueConstraint(fields=('day', 'book'), name='bookcirc_day_book_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='authorcirculation',
+            constraint=models.UniqueConstraint(fields=('day', 'author'), name='authorcirc_day_author_uniq'),
+        ),
+    ]
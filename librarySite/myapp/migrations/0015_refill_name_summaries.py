@@ -0,0 +1,41 @@
+from collections import defaultdict
+
+from django.db import migrations
+from django.db.models import Max, Min
+
+BATCH_SIZE = 2000
+
+
+def fix_name_summaries(apps, schema_editor):
+    # Books created or edited through the forms before the m2m handlers kept
+    # the instance in step hold empty or outdated names; rewrite only those.
+    Book = apps.get_model('myapp', 'Book')
+    bounds = Book.objects.aggregate(first=Min('pk'), last=Max('pk'))
+    if bounds['first'] is None:
+        return
+    for start in range(bounds['first'], bounds['last'] + 1, BATCH_SIZE):
+        in_batch = {'book_id__gte': start, 'book_id__lt': start + BATCH_SIZE}
+        authors, genres = defaultdict(list), defaultdict(list)
+        for book_id, name in Book.authors.through.objects.filter(**in_batch).values_list('book_id', 'author__name'):
+            authors[book_id].append(name)
+        for book_id, name in Book.genre.through.objects.filter(**in_batch).values_list('book_id', 'genre__name'):
+            genres[book_id].append(name)
+        stored = Book.objects.filter(pk__gte=start, pk__lt=start + BATCH_SIZE).values_list(
+            'pk', 'author_names', 'genre_names',
+        )
+        Book.objects.bulk_update([
+            Book(pk=pk, author_names=sorted(authors[pk]), genre_names=sorted(genres[pk]))
+            for pk, author_names, genre_names in stored
+            if (author_names, genre_names) != (sorted(authors[pk]), sorted(genres[pk]))
+        ], ['author_names', 'genre_names'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0014_book_recommendations'),
+    ]
+
+    operations = [
+        migrations.RunPython(fix_name_summaries, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 
 
@@ -8,6 +9,7 @@ class UserProfile(AbstractUser):
 
 class Genre(models.Model):
     name = models.CharField(unique=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -16,6 +18,7 @@ class Genre(models.Model):
 class Author(models.Model):
     name = models.CharField(max_length=64, unique=True)
     bio = models.TextField()
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -31,6 +34,11 @@ class Book(models.Model):
     genre = models.ManyToManyField(Genre, blank=True)
     authors = models.ManyToManyField(Author)
     borrower = models.OneToOneField(UserProfile, on_delete=models.SET_NULL, null=True, blank=True)
+    search_vector = SearchVectorField(null=True, editable=False)  # maintained by myapp.search
+    # sorted author and genre names for list pages, maintained by myapp.summaries
+    author_names = models.JSONField(default=list, blank=True, editable=False)
+    genre_names = models.JSONField(default=list, blank=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)  # also bumped when authors/genres change
 
     def __str__(self):
         return self.title
@@ -58,5 +66,117 @@ class BorrowRequestModel(models.Model):
     due_date = models.DateField(null=True, blank=True)
     complete_date = models.DateField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # BookDetailView: the viewer's request for this book
+            models.Index(fields=['borrower', 'book'], name='borrowreq_borrower_book_idx'),
+            # librarian queue: pending requests only
+            models.Index(fields=['request_date', 'id'], name='borrowreq_pending_idx', condition=models.Q(status=1)),
+            # librarian queue: all statuses, newest first, optionally by date range
+            models.Index(fields=['request_date', 'id'], name='borrowreq_queue_idx'),
+            # profile: a borrower's approved and collected loans
+            models.Index(fields=['borrower', 'due_date'], name='borrowreq_active_loans_idx',
+                         condition=models.Q(status__in=[2, 3])),
+            # rollup_circulation: loans completed on given days
+            models.Index(fields=['complete_date'], name='borrowreq_completed_idx', condition=models.Q(status=4)),
+            # sweep_overdue: collected loans not flagged yet
+            models.Index(fields=['due_date'], name='borrowreq_overdue_sweep_idx',
+                         condition=models.Q(status=3, overdue=False)),
+        ]
+
     def __str__(self):
         return f'{self.borrower} - {self.book}'
+
+
+class BorrowRequestArchive(models.Model):
+    # finished requests moved out of BorrowRequestModel by archive_requests;
+    # rows keep their original id
+    ARCHIVED_STATUSES = (BorrowRequestModel.COMPLETE, BorrowRequestModel.DECLINED)
+    status_choices = [
+        (BorrowRequestModel.COMPLETE, 'Complete'),
+        (BorrowRequestModel.DECLINED, 'Declined'),
+    ]
+    id = models.BigIntegerField(primary_key=True)
+    status = models.PositiveSmallIntegerField(choices=status_choices)
+    book = models.ForeignKey(Book, on_delete=models.CASCADE)
+    borrower = models.ForeignKey(UserProfile, on_delete=models.SET_NULL, null=True, blank=True)
+    overdue = models.BooleanField(default=False)
+    request_date = models.DateField()
+    approval_date = models.DateField(null=True, blank=True)
+    due_date = models.DateField(null=True, blank=True)
+    complete_date = models.DateField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # profile history and the archived librarian queue, newest first
+            models.Index(fields=['borrower', 'request_date', 'id'], name='borrowarch_borrower_idx'),
+            models.Index(fields=['request_date', 'id'], name='borrowarch_queue_idx'),
+            models.Index(fields=['complete_date'], name='borrowarch_completed_idx', condition=models.Q(status=4)),
+        ]
+
+    def __str__(self):
+        return f'{self.borrower} - {self.book}'
+
+
+class CirculationRollup(models.Model):
+    # one day of completed loans, written by the rollup_circulation command
+    day = models.DateField()
+    loans = models.PositiveIntegerField(default=0)
+    overdue = models.PositiveIntegerField(default=0)
+    loan_days = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+
+class BookCirculation(CirculationRollup):
+    book = models.ForeignKey(Book, on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['day', 'book'], name='bookcirc_day_book_uniq')]
+
+
+class GenreCirculation(CirculationRollup):
+    genre = models.ForeignKey(Genre, on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['day', 'genre'], name='genrecirc_day_genre_uniq')]
+
+
+class AuthorCirculation(CirculationRollup):
+    author = models.ForeignKey(Author, on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['day', 'author'], name='authorcirc_day_author_uniq')]
+
+
+class CoBorrowCount(models.Model):
+    # sparse, symmetric co-borrow matrix: readers who borrowed both books; the
+    # diagonal (book == other) holds the readers of the book
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='+')
+    other = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='+')
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['book', 'other'], name='coborrow_book_other_uniq')]
+
+
+class BookRecommendation(models.Model):
+    # top-K neighbours of a book by co-borrowing, rank 1 first
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='recommendations')
+    recommended = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['book', 'rank'], name='bookrec_book_rank_uniq')]
+
+
+class JobCheckpoint(models.Model):
+    # progress marker of a periodic management command, e.g. the last swept day
+    name = models.CharField(max_length=64, unique=True)
+    position = models.CharField(max_length=255, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.name}: {self.position}'
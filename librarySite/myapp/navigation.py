@@ -0,0 +1,50 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from .models import Genre, Author
+from .versions import aget_version, get_version
+
+NAVIGATION_AUTHORS_LIMIT = getattr(settings, 'NAVIGATION_AUTHORS_LIMIT', 15)
+NAVIGATION_TIMEOUT = getattr(settings, 'NAVIGATION_TIMEOUT', 60 * 15)
+
+
+def build_navigation():
+    genres = [{'name': name} for name in Genre.objects.order_by('name').values_list('name', flat=True)]
+    authors = list(
+        Author.objects.annotate(book_count=Count('book'))
+        .order_by('-book_count', 'name')
+        .values_list('name', flat=True)[:NAVIGATION_AUTHORS_LIMIT + 1]
+    )
+    return {
+        'genres': genres,
+        'authors': [{'name': name} for name in sorted(authors[:NAVIGATION_AUTHORS_LIMIT])],
+        'authors_more': len(authors) > NAVIGATION_AUTHORS_LIMIT,
+    }
+
+
+def get_navigation(request=None):
+    if request is not None and hasattr(request, '_navigation'):
+        return request._navigation
+    key = f'navigation:{get_version("navigation")}'
+    navigation = cache.get(key)
+    if navigation is None:
+        navigation = build_navigation()
+        cache.set(key, navigation, NAVIGATION_TIMEOUT)
+    if request is not None:
+        request._navigation = navigation
+    return navigation
+
+
+async def aget_navigation(request=None):
+    if request is not None and hasattr(request, '_navigation'):
+        return request._navigation
+    key = f'navigation:{await aget_version("navigation")}'
+    navigation = await cache.aget(key)
+    if navigation is None:
+        navigation = await sync_to_async(build_navigation)()
+        await cache.aset(key, navigation, NAVIGATION_TIMEOUT)
+    if request is not None:
+        request._navigation = navigation
+    return navigation
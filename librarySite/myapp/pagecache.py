@@ -0,0 +1,94 @@
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+from .versions import aget_version, bump_version, get_version
+
+PAGE_CACHE_ALIAS = getattr(settings, 'PAGE_CACHE_ALIAS', 'pages')
+PAGE_CACHE_TIMEOUT = getattr(settings, 'PAGE_CACHE_TIMEOUT', 60 * 10)
+
+
+def page_namespace(kind, key):
+    return f'page:{kind}:{md5(str(key).encode()).hexdigest()}'
+
+
+def invalidate_pages(kind, *keys):
+    if keys:
+        bump_version(*(page_namespace(kind, key) for key in keys))
+
+
+class AnonymousPageCacheMixin:
+    """
+    Caches the rendered page for anonymous visitors under the request URL and
+    the versions of everything the page shows, so a hit needs no database
+    query. Signal handlers bump those versions when the content changes.
+    """
+
+    page_cache_kind = None
+    page_cache_kwarg = None
+
+    def get_page_cache_namespaces(self):
+        # detail pages follow their own object, listings the whole catalog
+        if self.page_cache_kind is None:
+            return ('navigation', 'catalog')
+        return ('navigation', page_namespace(self.page_cache_kind, self.kwargs[self.page_cache_kwarg]))
+
+    def get_page_cache_key(self, request, versions=None):
+        if versions is None:
+            versions = [get_version(namespace) for namespace in self.get_page_cache_namespaces()]
+        url = md5(request.build_absolute_uri().encode()).hexdigest()
+        return f'pagecache:{url}:{":".join(str(version) for version in versions)}'
+
+    @staticmethod
+    def _cached_response(request, response):
+        not_modified = get_conditional_response(
+            request,
+            etag=response.get('ETag'),
+            last_modified=parse_http_date_safe(response.get('Last-Modified', '')),
+        )
+        return not_modified or response
+
+    @staticmethod
+    def _is_cacheable(response):
+        return response.status_code == 200 and not response.streaming
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.view_is_async:
+            return self._async_dispatch(request, *args, **kwargs)
+        if request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+            return super().dispatch(request, *args, **kwargs)
+        cache = caches[PAGE_CACHE_ALIAS]
+        key = self.get_page_cache_key(request)
+        response = cache.get(key)
+        if response is not None:
+            return self._cached_response(request, response)
+
+        response = super().dispatch(request, *args, **kwargs)
+        if self._is_cacheable(response):
+            if hasattr(response, 'render') and callable(response.render):
+                response.add_post_render_callback(lambda rendered: cache.set(key, rendered, PAGE_CACHE_TIMEOUT))
+            else:
+                cache.set(key, response, PAGE_CACHE_TIMEOUT)
+        return response
+
+    async def _async_dispatch(self, request, *args, **kwargs):
+        # request.user must already be resolved, see AsyncReadMixin
+        if request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+            return await super().dispatch(request, *args, **kwargs)
+        cache = caches[PAGE_CACHE_ALIAS]
+        versions = [await aget_version(namespace) for namespace in self.get_page_cache_namespaces()]
+        key = self.get_page_cache_key(request, versions)
+        response = await cache.aget(key)
+        if response is not None:
+            return self._cached_response(request, response)
+
+        response = await super().dispatch(request, *args, **kwargs)
+        if self._is_cacheable(response):
+            if hasattr(response, 'render') and callable(response.render):
+                response.add_post_render_callback(lambda rendered: cache.set(key, rendered, PAGE_CACHE_TIMEOUT))
+            else:
+                await cache.aset(key, response, PAGE_CACHE_TIMEOUT)
+        return response
@@ -0,0 +1,171 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import Http404
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class KeysetPage:
+    def __init__(self, object_list, paginator, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Cursor pagination over a stable, unique ordering, e.g. ('title', 'pk').
+
+    Each page is fetched with a single indexed range query instead of an
+    OFFSET, so deep pages cost the same as the first one.
+    """
+
+    def __init__(self, ordering, per_page):
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+
+    def encode_cursor(self, obj, reverse=False):
+        values = [self._value(obj, field) for field in self.ordering]
+        data = json.dumps({'v': values, 'r': reverse}, cls=DjangoJSONEncoder)
+        return base64.urlsafe_b64encode(data.encode()).decode()
+
+    def decode_cursor(self, cursor, fields=None):
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            values, reverse = data['v'], data['r']
+        except (ValueError, TypeError, KeyError):
+            raise InvalidCursor(cursor)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise InvalidCursor(cursor)
+        if fields is not None:
+            # a tampered cursor must not reach the query as a value of the wrong type
+            try:
+                values = [field.to_python(value) for field, value in zip(fields, values)]
+            except (ValueError, TypeError, ValidationError):
+                raise InvalidCursor(cursor)
+            if any(value is None for value in values):
+                raise InvalidCursor(cursor)
+        return values, bool(reverse)
+
+    def ordering_fields(self, queryset):
+        # the model or annotation field behind each ordering column
+        opts = queryset.model._meta
+        fields = []
+        for field in self.ordering:
+            name = self._name(field)
+            if name in queryset.query.annotations:
+                fields.append(queryset.query.annotations[name].output_field)
+            else:
+                fields.append(opts.pk if name == 'pk' else opts.get_field(name))
+        return fields
+
+    def paginate(self, queryset, cursor=None):
+        queryset, reverse = self._page_query(queryset, cursor)
+        return self._page(list(queryset), cursor, reverse)
+
+    async def apaginate(self, queryset, cursor=None):
+        queryset, reverse = self._page_query(queryset, cursor)
+        return self._page([row async for row in queryset], cursor, reverse)
+
+    def _page_query(self, queryset, cursor):
+        reverse = False
+        ordering = self.ordering
+        if cursor:
+            values, reverse = self.decode_cursor(cursor, self.ordering_fields(queryset))
+            if reverse:
+                ordering = tuple(self._invert(field) for field in ordering)
+            queryset = queryset.filter(self._after(ordering, values))
+        return queryset.order_by(*ordering)[:self.per_page + 1], reverse
+
+    def _page(self, rows, cursor, reverse):
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+
+        next_cursor = previous_cursor = None
+        if rows:
+            if has_more or reverse:
+                next_cursor = self.encode_cursor(rows[-1])
+            if cursor and (has_more or not reverse):
+                previous_cursor = self.encode_cursor(rows[0], reverse=True)
+        return KeysetPage(rows, self, next_cursor, previous_cursor)
+
+    def _after(self, ordering, values):
+        # (a, b) > (x, y)  <=>  a > x OR (a = x AND b > y), per-column direction aware
+        condition = Q()
+        for i, field in enumerate(ordering):
+            term = Q(**{self._name(ordering[j]): values[j] for j in range(i)})
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            term &= Q(**{f'{self._name(field)}__{lookup}': values[i]})
+            condition |= term
+        return condition
+
+    @staticmethod
+    def _name(field):
+        return field.lstrip('-')
+
+    @staticmethod
+    def _invert(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    def _value(self, obj, field):
+        return getattr(obj, self._name(field))
+
+
+class KeysetPaginationMixin:
+    paginate_by = 20
+    keyset_ordering = ('pk',)
+    cursor_kwarg = 'cursor'
+
+    def get_keyset_paginator(self):
+        return KeysetPaginator(self.keyset_ordering, self.paginate_by)
+
+    def paginate_keyset(self, queryset):
+        paginator = self.get_keyset_paginator()
+        try:
+            return paginator.paginate(queryset, self.request.GET.get(self.cursor_kwarg))
+        except InvalidCursor:
+            raise Http404('Invalid cursor.')
+
+    async def apaginate_keyset(self, queryset):
+        paginator = self.get_keyset_paginator()
+        try:
+            return await paginator.apaginate(queryset, self.request.GET.get(self.cursor_kwarg))
+        except InvalidCursor:
+            raise Http404('Invalid cursor.')
+
+    def get_page_context(self, page):
+        # what ListView.get_context_data() adds for a paginated list
+        return {
+            'paginator': page.paginator,
+            'page_obj': page,
+            'is_paginated': page.has_other_pages(),
+            'object_list': page.object_list,
+        }
+
+    def paginate_queryset(self, queryset, page_size):
+        page = self.paginate_keyset(queryset)
+        return page.paginator, page, page.object_list, page.has_other_pages()
@@ -0,0 +1,106 @@
+import heapq
+import math
+from collections import Counter, defaultdict
+from itertools import permutations
+
+from django.conf import settings
+from django.db.models import F
+
+from .models import BookRecommendation, BorrowRequestArchive, BorrowRequestModel, CoBorrowCount
+
+RECOMMENDATIONS_K = getattr(settings, 'RECOMMENDATIONS_K', 5)
+RECOMMENDATIONS_BATCH_SIZE = 500
+
+
+def completed_loans(**filters):
+    # (borrower, book) of completed loans, from the hot table and the archive
+    for model in (BorrowRequestModel, BorrowRequestArchive):
+        yield from model.objects.filter(
+            status=BorrowRequestModel.COMPLETE, borrower__isnull=False, **filters,
+        ).values_list('borrower_id', 'book_id').iterator()
+
+
+def baskets(loans):
+    books = defaultdict(set)
+    for borrower_id, book_id in loans:
+        books[borrower_id].add(book_id)
+    return books
+
+
+def count_pairs(books_by_reader):
+    """Co-borrow counts of every pair of books read by the same reader, diagonal included."""
+    counts = Counter()
+    for books in books_by_reader.values():
+        for book_id in books:
+            counts[book_id, book_id] += 1
+        counts.update(permutations(books, 2))
+    return counts
+
+
+def count_new_pairs(books_by_reader, history):
+    # what new loans add to the matrix: each book new to a reader pairs with
+    # the reader's earlier books and with the other new ones
+    counts = Counter()
+    for borrower_id, books in books_by_reader.items():
+        earlier = history.get(borrower_id, set())
+        new = books - earlier
+        for book_id in new:
+            counts[book_id, book_id] += 1
+            for other_id in earlier:
+                counts[book_id, other_id] += 1
+                counts[other_id, book_id] += 1
+        counts.update(permutations(new, 2))
+    return counts
+
+
+def add_counts(counts):
+    """Adds counts to CoBorrowCount and returns the books whose neighbours may have changed."""
+    book_ids = {book_id for book_id, _ in counts}
+    existing = {
+        (row.book_id, row.other_id): row
+        for row in CoBorrowCount.objects.filter(book_id__in=book_ids).iterator()
+    }
+    created, updated = [], []
+    for (book_id, other_id), count in counts.items():
+        row = existing.get((book_id, other_id))
+        if row is None:
+            created.append(CoBorrowCount(book_id=book_id, other_id=other_id, count=count))
+        else:
+            row.count += count
+            updated.append(row)
+    CoBorrowCount.objects.bulk_create(created, batch_size=1000)
+    CoBorrowCount.objects.bulk_update(updated, ['count'], batch_size=1000)
+    # a changed diagonal changes the scores of all of the book's partners
+    new_readers = {book_id for book_id, other_id in counts if book_id == other_id}
+    return book_ids | {other_id for book_id, other_id in existing if book_id in new_readers}
+
+
+def refresh_recommendations(book_ids):
+    """Recomputes the top-K neighbours of the books by cosine similarity."""
+    book_ids = sorted(book_ids)
+    for start in range(0, len(book_ids), RECOMMENDATIONS_BATCH_SIZE):
+        batch = book_ids[start:start + RECOMMENDATIONS_BATCH_SIZE]
+        pairs = defaultdict(dict)
+        for book_id, other_id, count in CoBorrowCount.objects.filter(book_id__in=batch).values_list(
+                'book_id', 'other_id', 'count').iterator():
+            pairs[book_id][other_id] = count
+        others = {other_id for row in pairs.values() for other_id in row}
+        readers = dict(
+            CoBorrowCount.objects.filter(book_id__in=others, other_id=F('book_id')).values_list('book_id', 'count')
+        )
+        recommendations = []
+        for book_id, row in pairs.items():
+            scores = [
+                (count / math.sqrt(readers[book_id] * readers[other_id]), count, other_id)
+                for other_id, count in row.items() if other_id != book_id
+            ]
+            for rank, (score, _, other_id) in enumerate(heapq.nlargest(RECOMMENDATIONS_K, scores), 1):
+                recommendations.append(BookRecommendation(book_id=book_id, recommended_id=other_id, rank=rank, score=score))
+        BookRecommendation.objects.filter(book_id__in=batch).delete()
+        BookRecommendation.objects.bulk_create(recommendations, batch_size=1000)
+
+
+def get_recommendations(book):
+    # served from the precomputed table: one indexed lookup on (book, rank)
+    return (BookRecommendation.objects.filter(book=book).order_by('rank')
+            .select_related('recommended').defer('recommended__search_vector'))
@@ -0,0 +1,87 @@
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import Case, Exists, F, FloatField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Cast
+
+from .models import Author, Book, Genre
+
+SEARCH_CONFIG = getattr(settings, 'SEARCH_CONFIG', 'english')
+SEARCH_MAX_QUERY_LENGTH = 200
+
+# (field or lookup, postgres weight, fallback score)
+SEARCH_FIELDS = (
+    ('title', 'A', 8),
+    ('authors', 'B', 4),
+    ('genres', 'C', 2),
+    ('publisher', 'C', 2),
+    ('summary', 'D', 1),
+)
+
+
+def uses_full_text_search():
+    return connection.vendor == 'postgresql'
+
+
+def _names(model, relation):
+    from django.contrib.postgres.aggregates import StringAgg
+
+    return Subquery(
+        model.objects.filter(**{relation: OuterRef('pk')})
+        .values(relation)
+        .annotate(names=StringAgg('name', ' '))
+        .values('names')
+    )
+
+
+def search_vector_expression():
+    sources = {
+        'title': F('title'),
+        'authors': _names(Author, 'book'),
+        'genres': _names(Genre, 'book'),
+        'publisher': F('publisher'),
+        'summary': F('summary'),
+    }
+    vector = None
+    for field, weight, _ in SEARCH_FIELDS:
+        part = SearchVector(sources[field], weight=weight, config=SEARCH_CONFIG)
+        vector = part if vector is None else vector + part
+    return vector
+
+
+def refresh_search_vectors(books):
+    # Recomputes the stored vector for a Book queryset in one UPDATE; a no-op
+    # on backends without full-text search, which search the columns directly.
+    if uses_full_text_search():
+        books.update(search_vector=search_vector_expression())
+
+
+def search_books(text):
+    text = text.strip()[:SEARCH_MAX_QUERY_LENGTH]
+    if not text:
+        return Book.objects.none().annotate(rank=Value(0.0, output_field=FloatField()))
+    if uses_full_text_search():
+        query = SearchQuery(text, search_type='websearch', config=SEARCH_CONFIG)
+        # ts_rank() is a real; widen it so the keyset cursor round-trips exactly
+        rank = Cast(SearchRank(F('search_vector'), query), FloatField())
+        return Book.objects.filter(search_vector=query).annotate(rank=rank)
+    return _fallback_search(text.split())
+
+
+def _fallback_search(terms):
+    queryset = Book.objects.all()
+    rank = Value(0.0, output_field=FloatField())
+    for term in terms:
+        matches = {
+            'title': Q(title__icontains=term),
+            'authors': Q(Exists(Book.authors.through.objects.filter(book=OuterRef('pk'), author__name__icontains=term))),
+            'genres': Q(Exists(Book.genre.through.objects.filter(book=OuterRef('pk'), genre__name__icontains=term))),
+            'publisher': Q(publisher__icontains=term),
+            'summary': Q(summary__icontains=term),
+        }
+        any_match = Q()
+        for field, _, score in SEARCH_FIELDS:
+            any_match |= matches[field]
+            rank += Case(When(matches[field], then=Value(float(score))), default=Value(0.0), output_field=FloatField())
+        queryset = queryset.filter(any_match)
+    return queryset.annotate(rank=rank)
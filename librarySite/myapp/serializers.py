@@ -0,0 +1,50 @@
+from rest_framework import serializers
+
+from .models import Author, Book, BorrowRequestModel, Genre
+
+
+class SparseFieldsMixin:
+    """Drops every field not listed in the ?fields=a,b query parameter."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        fields = request.query_params.get('fields') if request is not None else None
+        if fields:
+            allowed = set(fields.split(','))
+            for name in set(self.fields) - allowed:
+                self.fields.pop(name)
+
+
+class GenreSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Genre
+        fields = ['id', 'name']
+
+
+class AuthorSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Author
+        fields = ['id', 'name', 'bio']
+
+
+class BookSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    authors = serializers.ListField(source='author_names', child=serializers.CharField(), read_only=True)
+    genres = serializers.ListField(source='genre_names', child=serializers.CharField(), read_only=True)
+
+    class Meta:
+        model = Book
+        fields = ['id', 'isbn', 'title', 'summary', 'publisher', 'published_date', 'available', 'authors', 'genres']
+
+
+class BorrowRequestSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    book = serializers.SlugRelatedField(read_only=True, slug_field='isbn')
+    borrower = serializers.SlugRelatedField(read_only=True, slug_field='username')
+
+    class Meta:
+        model = BorrowRequestModel
+        fields = [
+            'id', 'status', 'status_display', 'book', 'borrower', 'overdue',
+            'request_date', 'approval_date', 'due_date', 'complete_date',
+        ]
@@ -0,0 +1,92 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from .events import publish_borrow_request
+from .models import Author, Book, BorrowRequestModel, Genre
+from .signals import touch
+from .versions import bump_version
+
+LOAN_PERIOD = timedelta(weeks=2)
+
+# target status -> statuses it can be reached from
+TRANSITIONS = {
+    BorrowRequestModel.APPROVED: (BorrowRequestModel.PENDING,),
+    BorrowRequestModel.DECLINED: (BorrowRequestModel.PENDING,),
+    BorrowRequestModel.COLLECTED: (BorrowRequestModel.APPROVED,),
+    BorrowRequestModel.COMPLETE: (BorrowRequestModel.COLLECTED,),
+}
+
+
+class InvalidTransition(Exception):
+    pass
+
+
+def _transition(borrow_request, status, **changes):
+    # Compare-and-set on the current status: of two concurrent transitions of
+    # the same request only one UPDATE matches a row, the other is rejected.
+    updated = BorrowRequestModel.objects.filter(
+        pk=borrow_request.pk, status__in=TRANSITIONS[status],
+    ).update(status=status, **changes)
+    if not updated:
+        label = dict(BorrowRequestModel.status_choices)[status]
+        raise InvalidTransition(f'Borrow request {borrow_request.pk} cannot become {label}.')
+
+
+def _claim_book(book_id):
+    # the book row is the contended resource: only one loan may flip it
+    if not Book.objects.filter(pk=book_id, available=True).update(available=False, updated_at=timezone.now()):
+        raise InvalidTransition('The book is not available.')
+
+
+def _release_book(book_id):
+    Book.objects.filter(pk=book_id).update(available=True, updated_at=timezone.now())
+
+
+def _availability_changed(book_id):
+    # update() bypasses the model signals that keep the caches in sync
+    touch(Book.objects.filter(pk=book_id))
+    touch(Author.objects.filter(book=book_id))
+    touch(Genre.objects.filter(book=book_id))
+    bump_version('catalog')
+
+
+def _finish(borrow_request):
+    bump_version('requests')
+    borrow_request.refresh_from_db()
+    publish_borrow_request(borrow_request)
+    return borrow_request
+
+
+def approve_request(borrow_request):
+    _transition(borrow_request, BorrowRequestModel.APPROVED, approval_date=timezone.now().date())
+    return _finish(borrow_request)
+
+
+def decline_request(borrow_request):
+    _transition(borrow_request, BorrowRequestModel.DECLINED)
+    return _finish(borrow_request)
+
+
+def take_book(borrow_request):
+    today = timezone.now().date()
+    with transaction.atomic():
+        _transition(borrow_request, BorrowRequestModel.COLLECTED, due_date=today + LOAN_PERIOD)
+        _claim_book(borrow_request.book_id)
+    _availability_changed(borrow_request.book_id)
+    return _finish(borrow_request)
+
+
+def return_book(borrow_request):
+    today = timezone.now().date()
+    with transaction.atomic():
+        _transition(
+            borrow_request, BorrowRequestModel.COMPLETE,
+            complete_date=today,
+            overdue=Case(When(due_date__lt=today, then=Value(True)), default=F('overdue')),
+        )
+        _release_book(borrow_request.book_id)
+    _availability_changed(borrow_request.book_id)
+    return _finish(borrow_request)
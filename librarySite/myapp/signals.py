@@ -0,0 +1,176 @@
+from django.db.models.signals import pre_save, post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Genre, Author, Book, BorrowRequestModel
+from .pagecache import invalidate_pages
+from .search import refresh_search_vectors
+from .summaries import refresh_name_summaries
+from .versions import bump_version
+
+# through model -> name of the Book-side M2M field
+BOOK_RELATIONS = {
+    Book.authors.through: 'authors',
+    Book.genre.through: 'genre',
+}
+
+# model -> (page cache kind, natural key used in its URL)
+PAGE_KEYS = {
+    Book: ('book', 'isbn'),
+    Author: ('author', 'name'),
+    Genre: ('genre', 'name'),
+}
+
+# Book fields rendered outside the book's own page
+BOOK_CARD_FIELDS = ('title', 'isbn', 'published_date', 'available', 'summary')
+BOOK_SEARCH_FIELDS = ('title', 'publisher', 'summary')
+BOOK_LINK_FIELDS = ('title', 'isbn')
+
+# model -> fields whose value before a save the post_save handlers compare against
+TRACKED_FIELDS = {
+    Book: tuple(dict.fromkeys(BOOK_CARD_FIELDS + BOOK_SEARCH_FIELDS + BOOK_LINK_FIELDS)),
+    Author: ('name',),
+    Genre: ('name',),
+}
+
+
+def touch(queryset):
+    kind, field = PAGE_KEYS[queryset.model]
+    invalidate_pages(kind, *queryset.values_list(field, flat=True))
+    queryset.update(updated_at=timezone.now())
+
+
+def changed(instance, fields):
+    # whether the save changed any of the fields; a new row changes them all
+    old = instance._old_values
+    return old is None or any(field in old and old[field] != getattr(instance, field) for field in fields)
+
+
+@receiver(pre_save, sender=Book)
+@receiver(pre_save, sender=Genre)
+@receiver(pre_save, sender=Author)
+def remember_old_values(sender, instance, update_fields, **kwargs):
+    # one query, and none when update_fields leaves out every tracked field
+    fields = [field for field in TRACKED_FIELDS[sender] if update_fields is None or field in update_fields]
+    if instance.pk is None:
+        instance._old_values = None
+    elif not fields:
+        instance._old_values = {}
+    else:
+        instance._old_values = sender.objects.filter(pk=instance.pk).values(*fields).first()
+
+
+@receiver([post_save, post_delete], sender=Book)
+@receiver([post_save, post_delete], sender=Genre)
+@receiver([post_save, post_delete], sender=Author)
+def invalidate_own_pages(sender, instance, signal, **kwargs):
+    kind, field = PAGE_KEYS[sender]
+    keys = {getattr(instance, field)}
+    if signal is post_save:
+        # and the page under the old URL after a rename
+        keys.add((instance._old_values or {}).get(field))
+    invalidate_pages(kind, *keys - {None})
+
+
+@receiver([post_save, post_delete], sender=Genre)
+@receiver([post_save, post_delete], sender=Author)
+# the authors in the navigation are the ones with the most books
+@receiver(post_delete, sender=Book)
+@receiver(m2m_changed, sender=Book.authors.through)
+def invalidate_navigation(sender, **kwargs):
+    if kwargs.get('action', 'post_').startswith('post_'):
+        bump_version('navigation')
+
+
+@receiver([post_save, post_delete], sender=Book)
+@receiver([post_save, post_delete], sender=Genre)
+@receiver([post_save, post_delete], sender=Author)
+@receiver(m2m_changed, sender=Book.authors.through)
+@receiver(m2m_changed, sender=Book.genre.through)
+def invalidate_catalog(sender, **kwargs):
+    if kwargs.get('action', 'post_').startswith('post_'):
+        bump_version('catalog')
+
+
+@receiver([post_save, post_delete], sender=BorrowRequestModel)
+def invalidate_requests(sender, **kwargs):
+    bump_version('requests')
+
+
+@receiver(post_save, sender=Book)
+def update_book_dependents(sender, instance, created, **kwargs):
+    # a new book has no links yet, they come with the m2m_changed handlers
+    if not created and changed(instance, BOOK_CARD_FIELDS):
+        # author and genre pages list their books, so they change with them
+        touch(Author.objects.filter(book=instance))
+        touch(Genre.objects.filter(book=instance))
+    if changed(instance, BOOK_SEARCH_FIELDS):
+        refresh_search_vectors(Book.objects.filter(pk=instance.pk))
+    # pages recommending the book show its title and link
+    if not created and changed(instance, BOOK_LINK_FIELDS):
+        touch(Book.objects.filter(recommendations__recommended=instance))
+
+
+@receiver(pre_delete, sender=Book)
+def remember_book_links(sender, instance, **kwargs):
+    instance._linked_author_ids = list(instance.authors.values_list('pk', flat=True))
+    instance._linked_genre_ids = list(instance.genre.values_list('pk', flat=True))
+    instance._recommending_ids = list(
+        Book.objects.filter(recommendations__recommended=instance).values_list('pk', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Book)
+def update_unlinked_dependents(sender, instance, **kwargs):
+    touch(Author.objects.filter(pk__in=instance._linked_author_ids))
+    touch(Genre.objects.filter(pk__in=instance._linked_genre_ids))
+    # the recommendations of the book went with it
+    touch(Book.objects.filter(pk__in=instance._recommending_ids))
+
+
+@receiver(m2m_changed, sender=Book.authors.through)
+@receiver(m2m_changed, sender=Book.genre.through)
+def update_linked_objects(sender, instance, action, reverse, model, pk_set, **kwargs):
+    relation = BOOK_RELATIONS[sender]
+    if action == 'pre_clear':
+        # clear() does not report the affected objects
+        linked = model.objects.filter(**{relation: instance}) if reverse else model.objects.filter(book=instance)
+        instance._cleared_pks = list(linked.values_list('pk', flat=True))
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    pks = instance._cleared_pks if action == 'post_clear' else pk_set
+    books = Book.objects.filter(pk__in=pks) if reverse else Book.objects.filter(pk=instance.pk)
+    refresh_search_vectors(books)
+    # before the touch: book cards are cached under the book's updated_at
+    refresh_name_summaries(books)
+    if not reverse:
+        # save() writes back the names the instance holds, it would undo the refresh
+        instance.refresh_from_db(fields=['author_names', 'genre_names'])
+    touch(type(instance).objects.filter(pk=instance.pk))
+    touch(model.objects.filter(pk__in=pks))
+
+
+@receiver(pre_delete, sender=Genre)
+@receiver(pre_delete, sender=Author)
+def remember_linked_books(sender, instance, **kwargs):
+    instance._linked_book_ids = list(instance.book_set.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_save, sender=Author)
+def update_renamed_books(sender, instance, created, **kwargs):
+    # books show their authors' and genres' names, nothing else
+    if not created and changed(instance, ('name',)):
+        books = Book.objects.filter(pk__in=instance.book_set.values('pk'))
+        refresh_search_vectors(books)
+        refresh_name_summaries(books)
+        touch(books)
+
+
+@receiver(post_delete, sender=Genre)
+@receiver(post_delete, sender=Author)
+def update_unlinked_books(sender, instance, **kwargs):
+    books = Book.objects.filter(pk__in=instance._linked_book_ids)
+    refresh_search_vectors(books)
+    refresh_name_summaries(books)
+    touch(books)
@@ -0,0 +1,50 @@
+(function () {
+  function attach(select) {
+    var input = document.createElement('input');
+    input.type = 'search';
+    input.className = 'form-control mb-1';
+    input.placeholder = 'Type to search...';
+    select.parentNode.insertBefore(input, select);
+
+    var timer = null;
+    var controller = null;
+    input.addEventListener('input', function () {
+      clearTimeout(timer);
+      timer = setTimeout(function () {
+        if (controller) {
+          controller.abort();
+        }
+        var term = input.value.trim();
+        if (!term) {
+          return;
+        }
+        controller = new AbortController();
+        var url = select.dataset.autocompleteUrl + '?q=' + encodeURIComponent(term);
+        fetch(url, {signal: controller.signal, credentials: 'same-origin'})
+          .then(function (response) { return response.json(); })
+          .then(function (data) { update(select, data.results); })
+          .catch(function () {});
+      }, 250);
+    });
+  }
+
+  function update(select, results) {
+    var keep = {};
+    Array.prototype.slice.call(select.options).forEach(function (option) {
+      if (option.selected && option.value) {
+        keep[option.value] = true;
+      } else if (option.value) {
+        select.removeChild(option);
+      }
+    });
+    results.forEach(function (result) {
+      if (!keep[String(result.id)]) {
+        select.appendChild(new Option(result.text, result.id));
+      }
+    });
+  }
+
+  document.addEventListener('DOMContentLoaded', function () {
+    document.querySelectorAll('select[data-autocomplete-url]').forEach(attach);
+  });
+})();
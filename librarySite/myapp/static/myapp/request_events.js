@@ -0,0 +1,20 @@
+(function () {
+  function attach(box) {
+    var list = box.querySelector('ul');
+    var source = new EventSource(box.dataset.eventsUrl);
+    source.addEventListener('borrow_request', function (event) {
+      var data = JSON.parse(event.data);
+      var item = document.createElement('li');
+      var link = document.createElement('a');
+      link.href = data.url;
+      link.textContent = data.message;
+      item.appendChild(link);
+      list.appendChild(item);
+      box.hidden = false;
+    });
+  }
+
+  document.addEventListener('DOMContentLoaded', function () {
+    document.querySelectorAll('[data-events-url]').forEach(attach);
+  });
+})();
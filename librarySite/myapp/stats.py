@@ -0,0 +1,117 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db.models import Min, Sum
+from django.utils import timezone
+
+from .models import (
+    AuthorCirculation, Book, BookCirculation, BorrowRequestArchive, BorrowRequestModel, GenreCirculation,
+    JobCheckpoint,
+)
+from .services import LOAN_PERIOD
+
+ROLLUP_CHECKPOINT = 'rollup_circulation'
+STATS_LIMIT = 10
+# longer windows reach past the first loan anyway, and dates overflow long before int does
+STATS_MAX_DAYS = 36500
+
+
+def completed_loans(first_day, last_day):
+    # loans count on the day the book came back, from the hot table and the archive
+    for model in (BorrowRequestModel, BorrowRequestArchive):
+        yield from model.objects.filter(
+            status=BorrowRequestModel.COMPLETE, complete_date__range=(first_day, last_day),
+        ).values_list('complete_date', 'book_id', 'overdue', 'due_date', 'approval_date', 'request_date').iterator()
+
+
+def first_loan_day():
+    days = [
+        model.objects.filter(status=BorrowRequestModel.COMPLETE).aggregate(day=Min('complete_date'))['day']
+        for model in (BorrowRequestModel, BorrowRequestArchive)
+    ]
+    days = [day for day in days if day is not None]
+    return min(days) if days else None
+
+
+def build_rollups(first_day, last_day):
+    """Returns unsaved BookCirculation, GenreCirculation and AuthorCirculation rows for the days."""
+    books = defaultdict(lambda: [0, 0, 0])
+    for day, book_id, overdue, due_date, approval_date, request_date in completed_loans(first_day, last_day):
+        # the collection day is not stored, but the due date is set from it
+        collected = due_date - LOAN_PERIOD if due_date else approval_date or request_date
+        totals = books[day, book_id]
+        totals[0] += 1
+        totals[1] += overdue
+        totals[2] += max((day - collected).days, 0)
+
+    book_ids = {book_id for _, book_id in books}
+    genres, authors = defaultdict(lambda: [0, 0, 0]), defaultdict(lambda: [0, 0, 0])
+    for through, rollup, field in ((Book.genre.through, genres, 'genre_id'), (Book.authors.through, authors, 'author_id')):
+        links = defaultdict(list)
+        for book_id, target_id in through.objects.filter(book_id__in=book_ids).values_list('book_id', field):
+            links[book_id].append(target_id)
+        for (day, book_id), (loans, overdue, loan_days) in books.items():
+            for target_id in links[book_id]:
+                totals = rollup[day, target_id]
+                totals[0] += loans
+                totals[1] += overdue
+                totals[2] += loan_days
+
+    def rows(model, field, rollup):
+        return [
+            model(day=day, loans=loans, overdue=overdue, loan_days=loan_days, **{field: target_id})
+            for (day, target_id), (loans, overdue, loan_days) in rollup.items()
+        ]
+
+    return rows(BookCirculation, 'book_id', books), rows(GenreCirculation, 'genre_id', genres), \
+        rows(AuthorCirculation, 'author_id', authors)
+
+
+def rolled_up_until():
+    checkpoint = JobCheckpoint.objects.filter(name=ROLLUP_CHECKPOINT).first()
+    return checkpoint.position if checkpoint and checkpoint.position else None
+
+
+def parse_days(value):
+    # the ?days=N window; None (all time) past STATS_MAX_DAYS, ValueError unless a whole number >= 0
+    days = int(value)
+    if days < 0:
+        raise ValueError(f'{value!r} is not a number of days.')
+    return days if days <= STATS_MAX_DAYS else None
+
+
+def circulation_stats(days=None, limit=STATS_LIMIT):
+    """
+    Circulation over the last days (all time when None), read from the daily
+    rollups only: totals, overdue rate, average loan length and the most
+    borrowed books, genres and authors.
+    """
+    rollups = {'books': BookCirculation.objects.all(), 'genres': GenreCirculation.objects.all(),
+               'authors': AuthorCirculation.objects.all()}
+    since = None
+    if days is not None:
+        since = timezone.now().date() - timedelta(days=days)
+        rollups = {name: queryset.filter(day__gt=since) for name, queryset in rollups.items()}
+
+    totals = rollups['books'].aggregate(loans=Sum('loans'), overdue=Sum('overdue'), loan_days=Sum('loan_days'))
+    loans = totals['loans'] or 0
+    return {
+        'since': since,
+        'until': rolled_up_until(),
+        'loans': loans,
+        'overdue': totals['overdue'] or 0,
+        'overdue_rate': round((totals['overdue'] or 0) / loans, 4) if loans else None,
+        'average_loan_days': round((totals['loan_days'] or 0) / loans, 1) if loans else None,
+        'books': list(
+            rollups['books'].values('book__isbn', 'book__title')
+            .annotate(loans=Sum('loans'), overdue=Sum('overdue')).order_by('-loans', 'book__title')[:limit]
+        ),
+        'genres': list(
+            rollups['genres'].values('genre__name')
+            .annotate(loans=Sum('loans'), overdue=Sum('overdue')).order_by('-loans', 'genre__name')[:limit]
+        ),
+        'authors': list(
+            rollups['authors'].values('author__name')
+            .annotate(loans=Sum('loans'), overdue=Sum('overdue')).order_by('-loans', 'author__name')[:limit]
+        ),
+    }
@@ -0,0 +1,65 @@
+import gzip
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+STATIC_COMPRESS_EXTENSIONS = getattr(
+    settings, 'STATIC_COMPRESS_EXTENSIONS', ('.css', '.js', '.svg', '.json', '.txt', '.map', '.html'),
+)
+# below this a compressed response hardly saves anything over its headers
+STATIC_COMPRESS_MIN_SIZE = getattr(settings, 'STATIC_COMPRESS_MIN_SIZE', 256)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    collectstatic writes every file under a content-hashed name, so a changed
+    file gets a new URL and the old one can be cached forever, and next to
+    each text file precompressed .gz and .br copies (the latter only with the
+    Brotli package of requirements.txt installed) for the web server to send
+    as is instead of compressing on every request.
+    """
+
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # not collected (tests, loadtest, runserver without collectstatic):
+            # the unhashed name, which the staticfiles finders can still serve
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        hashed_names = []
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                hashed_names.append(hashed_name)
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        for hashed_name in dict.fromkeys(hashed_names):
+            if hashed_name.endswith(STATIC_COMPRESS_EXTENSIONS):
+                self.compress(hashed_name)
+
+    def compress(self, name):
+        with self.open(name) as original:
+            content = original.read()
+        if len(content) < STATIC_COMPRESS_MIN_SIZE:
+            return
+        # mtime=0 keeps the output the same for the same input, so repeated
+        # builds do not change the files
+        variants = [('.gz', gzip.compress(content, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append(('.br', brotli.compress(content, quality=11)))
+        for suffix, compressed in variants:
+            if len(compressed) >= len(content):
+                continue
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            self._save(name + suffix, ContentFile(compressed))
@@ -0,0 +1,27 @@
+from collections import defaultdict
+
+from .models import Book
+
+SUMMARY_BATCH_SIZE = 1000
+
+
+def linked_names(book_ids):
+    # book id -> (sorted author names, sorted genre names), one query per relation
+    authors, genres = defaultdict(list), defaultdict(list)
+    for book_id, name in Book.authors.through.objects.filter(book_id__in=book_ids).values_list('book_id', 'author__name'):
+        authors[book_id].append(name)
+    for book_id, name in Book.genre.through.objects.filter(book_id__in=book_ids).values_list('book_id', 'genre__name'):
+        genres[book_id].append(name)
+    return {book_id: (sorted(authors[book_id]), sorted(genres[book_id])) for book_id in book_ids}
+
+
+def refresh_name_summaries(books):
+    # Recomputes Book.author_names and genre_names for a Book queryset, so list
+    # pages can render author and genre names without joining the M2M tables.
+    book_ids = list(books.values_list('pk', flat=True))
+    for start in range(0, len(book_ids), SUMMARY_BATCH_SIZE):
+        names = linked_names(book_ids[start:start + SUMMARY_BATCH_SIZE])
+        Book.objects.bulk_update(
+            [Book(pk=pk, author_names=authors, genre_names=genres) for pk, (authors, genres) in names.items()],
+            ['author_names', 'genre_names'],
+        )
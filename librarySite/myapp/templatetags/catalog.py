@@ -0,0 +1,58 @@
+from django import template
+from django.conf import settings
+from django.core.cache import caches
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+from ..pagecache import PAGE_CACHE_ALIAS
+
+BOOK_CARD_TEMPLATE = 'books/book_card.html'
+BOOK_CARD_TIMEOUT = getattr(settings, 'BOOK_CARD_TIMEOUT', 60 * 60 * 24)
+BOOK_CARD_VERSION = 2  # bump when book_card.html changes
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def cursor_url(context, cursor, cursor_kwarg='cursor'):
+    params = context['request'].GET.copy()
+    params[cursor_kwarg] = cursor
+    return f'?{params.urlencode()}'
+
+
+@register.simple_tag(takes_context=True)
+def filter_url(context, cursor_kwarg='cursor', **filters):
+    # the current query with some filters changed, back on the first page
+    params = context['request'].GET.copy()
+    params.pop(cursor_kwarg, None)
+    for name, value in filters.items():
+        if value is None or value == '':
+            params.pop(name, None)
+        else:
+            params[name] = value
+    return f'?{params.urlencode()}'
+
+
+def book_card_key(book):
+    # updated_at moves whenever the book, its authors or its genres change
+    return f'bookcard:{BOOK_CARD_VERSION}:{book.pk}:{book.updated_at.isoformat()}'
+
+
+@register.simple_tag
+def book_cards(books):
+    """
+    Renders books/book_card.html for each book, shared by the index, genre and
+    author pages. Cards are cached per book version, so a warm page costs one
+    get_many() and only changed books are rendered again.
+    """
+    cache = caches[PAGE_CACHE_ALIAS]
+    keys = [book_card_key(book) for book in books]
+    cards = cache.get_many(keys)
+    missing = {}
+    card_template = get_template(BOOK_CARD_TEMPLATE)
+    for book, key in zip(books, keys):
+        if key not in cards:
+            cards[key] = missing[key] = card_template.render({'book': book})
+    if missing:
+        cache.set_many(missing, BOOK_CARD_TIMEOUT)
+    return mark_safe(''.join(cards[key] for key in keys))
@@ -1,3 +1,842 @@
-from django.test import TestCase
+import base64
+import gzip
+import json
+import tempfile
+import threading
+from datetime import date, timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .forms import CreateNewBookForm, LoginViewForm
+from .models import (
+    Author, AuthorCirculation, Book, BookCirculation, BookRecommendation, BorrowRequestArchive, BorrowRequestModel,
+    Genre, GenreCirculation, JobCheckpoint, UserProfile,
+)
+from .loaders import RequestLoader
+from .management.commands.archive_requests import ARCHIVE_FIELDS
+from .navigation import get_navigation
+from .pagecache import PAGE_CACHE_ALIAS, page_namespace
+from .pagination import InvalidCursor, KeysetPaginator
+from .search import _fallback_search, search_books
+from .services import LOAN_PERIOD, InvalidTransition, approve_request, decline_request, return_book, take_book
+from .signals import remember_old_values
+from .storage import brotli
+from .stats import circulation_stats
+from .templatetags.catalog import book_card_key, book_cards
+from .throttle import FailureThrottle
+from .versions import get_version
+
+
+def make_book(**fields):
+    return Book.objects.create(**{
+        'title': 'Dune', 'isbn': '9780441013593', 'summary': '', 'publisher': 'Ace',
+        'published_date': date(1965, 8, 1), **fields,
+    })
+
+
+def make_books(count, **fields):
+    return [make_book(title=f'Book {i:03}', isbn=f'B{i:012}', **fields) for i in range(count)]
+
+
+class NameSummaryTest(TestCase):
+    def setUp(self):
+        self.asimov = Author.objects.create(name='Isaac Asimov', bio='')
+        self.herbert = Author.objects.create(name='Frank Herbert', bio='')
+        self.science_fiction = Genre.objects.create(name='Science Fiction')
+        self.classic = Genre.objects.create(name='Classic')
+
+    def book_data(self, authors, genres):
+        return {
+            'title': 'Foundation', 'isbn': '9780553293357', 'summary': 'Psychohistory.', 'publisher': 'Gnome Press',
+            'published_date': '1951-05-01',
+            'authors': [author.pk for author in authors], 'genre': [genre.pk for genre in genres],
+        }
+
+    def test_create_book_form(self):
+        form = CreateNewBookForm(self.book_data([self.asimov], [self.science_fiction]))
+        self.assertTrue(form.is_valid(), form.errors)
+        form.create_book()
+        book = Book.objects.get(isbn='9780553293357')
+        self.assertEqual(book.author_names, ['Isaac Asimov'])
+        self.assertEqual(book.genre_names, ['Science Fiction'])
+
+    def test_update_book_view(self):
+        book = make_book()
+        book.authors.set([self.asimov])
+        self.client.force_login(UserProfile.objects.create(username='librarian', is_librarian=True))
+        data = self.book_data([self.herbert], [self.classic, self.science_fiction])
+        response = self.client.post(reverse('update_book_view', kwargs={'isbn': book.isbn}), data)
+        self.assertRedirects(response, reverse('main_view'), fetch_redirect_response=False)
+        book.refresh_from_db()
+        self.assertEqual(book.author_names, ['Frank Herbert'])
+        self.assertEqual(book.genre_names, ['Classic', 'Science Fiction'])
+
+
+    def test_save_after_set(self):
+        book = make_book()
+        book.authors.set([self.asimov])
+        book.save()
+        book.refresh_from_db()
+        self.assertEqual(book.author_names, ['Isaac Asimov'])
+
+    def test_save_leaves_summaries_alone(self):
+        book = make_book()
+        book.title = 'Dune Messiah'
+        with mock.patch('myapp.signals.refresh_name_summaries') as refresh:
+            book.save()
+        refresh.assert_not_called()
+
+@mock.patch('myapp.navigation.NAVIGATION_AUTHORS_LIMIT', 1)
+class NavigationTest(TestCase):
+    # only the author with the most books is listed, ties by name
+    def setUp(self):
+        self.asimov = Author.objects.create(name='Isaac Asimov', bio='')
+        self.herbert = Author.objects.create(name='Frank Herbert', bio='')
+        self.book = make_book()
+
+    def listed_author(self):
+        return [author['name'] for author in get_navigation()['authors']]
+
+    def test_book_authors_change(self):
+        self.assertEqual(self.listed_author(), ['Frank Herbert'])
+        self.book.authors.add(self.asimov)
+        self.assertEqual(self.listed_author(), ['Isaac Asimov'])
+        self.book.authors.remove(self.asimov)
+        self.assertEqual(self.listed_author(), ['Frank Herbert'])
+
+    def test_book_delete(self):
+        self.book.authors.add(self.asimov)
+        self.assertEqual(self.listed_author(), ['Isaac Asimov'])
+        self.book.delete()
+        self.assertEqual(self.listed_author(), ['Frank Herbert'])
+
+
+class RecommendedBookChangeTest(TestCase):
+    def setUp(self):
+        self.book = make_book()
+        self.recommended = Book.objects.create(
+            title='Foundation', isbn='9780553293357', summary='', publisher='Gnome Press', published_date=date(1951, 5, 1),
+        )
+        BookRecommendation.objects.create(book=self.book, recommended=self.recommended, rank=1, score=1.0)
+        self.book.refresh_from_db()
+
+    def assertTouched(self):
+        # updated_at is the book page's Last-Modified, page cache and card key
+        updated_at = self.book.updated_at
+        self.book.refresh_from_db()
+        self.assertGreater(self.book.updated_at, updated_at)
+
+    def test_rename_recommended_book(self):
+        self.recommended.title = 'Foundation and Empire'
+        self.recommended.save()
+        self.assertTouched()
+
+    def test_delete_recommended_book(self):
+        self.recommended.delete()
+        self.assertTouched()
+
+
+class BookSaveTest(TestCase):
+    def setUp(self):
+        self.author = Author.objects.create(name='Frank Herbert', bio='')
+        self.book = make_book()
+        self.book.authors.add(self.author)
+        self.author.refresh_from_db()
+
+    def author_touched(self):
+        updated_at = self.author.updated_at
+        self.author.refresh_from_db()
+        return self.author.updated_at > updated_at
+
+    def test_unchanged_book(self):
+        self.book.save()
+        self.assertFalse(self.author_touched())
+        # the publisher is not on the author page
+        self.book.publisher = 'Chilton Books'
+        self.book.save(update_fields=['publisher'])
+        self.assertFalse(self.author_touched())
+        # nothing to compare, no query for the previous values
+        with self.assertNumQueries(0):
+            remember_old_values(Book, self.book, update_fields={'author_names'})
+
+    def test_changed_book(self):
+        self.book.title = 'Dune Messiah'
+        self.book.save()
+        self.assertTrue(self.author_touched())
+        self.book.available = False
+        self.book.save(update_fields=['available'])
+        self.assertTrue(self.author_touched())
+
+
+class RenameTest(TestCase):
+    def test_old_page_invalidated(self):
+        author = Author.objects.create(name='Frank Herbert', bio='')
+        version = get_version(page_namespace('author', 'Frank Herbert'))
+        author = Author.objects.get(pk=author.pk)
+        author.name = 'F. Herbert'
+        author.save()
+        self.assertGreater(get_version(page_namespace('author', 'Frank Herbert')), version)
+
+    def test_renamed_author_books(self):
+        author = Author.objects.create(name='Frank Herbert', bio='')
+        book = make_book()
+        book.authors.add(author)
+        author.name = 'F. Herbert'
+        author.save(update_fields=['name'])
+        book.refresh_from_db()
+        self.assertEqual(book.author_names, ['F. Herbert'])
+
+
+class BookCardCacheTest(TestCase):
+    def setUp(self):
+        self.author = Author.objects.create(name='Frank Herbert', bio='')
+        self.book = make_book()
+        self.book.authors.add(self.author)
+
+    def cards(self):
+        return book_cards(list(Book.objects.all()))
+
+    def test_cached_until_the_book_changes(self):
+        self.cards()
+        book = Book.objects.get(pk=self.book.pk)
+        caches[PAGE_CACHE_ALIAS].set(book_card_key(book), 'cached card')
+        self.assertEqual(self.cards(), 'cached card')
+        book.title = 'Dune Messiah'
+        book.save()
+        self.assertIn('Dune Messiah', self.cards())
+
+    def test_author_rename(self):
+        self.assertIn('Frank Herbert', self.cards())
+        self.author.name = 'F. Herbert'
+        self.author.save()
+        self.assertIn('F. Herbert', self.cards())
+
+
+class RequestLoaderTest(TestCase):
+    def setUp(self):
+        self.reader = UserProfile.objects.create(username='reader')
+        self.other = UserProfile.objects.create(username='other')
+        self.librarian = UserProfile.objects.create(username='librarian', is_librarian=True)
+
+    def test_load_many(self):
+        loader = RequestLoader()
+        loader.get(UserProfile, 'username', 'reader')
+        with self.assertNumQueries(1):
+            users = loader.load_many(UserProfile, [self.reader.pk, self.other.pk, 0])
+        self.assertEqual(users, {self.reader.pk: self.reader, self.other.pk: self.other})
+        with self.assertNumQueries(0):
+            self.assertIs(loader.load_many(UserProfile, [self.other.pk])[self.other.pk], users[self.other.pk])
+
+    def test_profile_borrowers(self):
+        for borrower, title in [(self.reader, 'Dune'), (self.other, 'Foundation')]:
+            BorrowRequestModel.objects.create(
+                book=make_book(title=title, isbn=title), borrower=borrower, request_date=date.today(),
+            )
+        self.client.force_login(self.librarian)
+        response = self.client.get(reverse('profile_view', kwargs={'username': 'librarian'}))
+        self.assertEqual(
+            [str(borrow_request) for borrow_request in response.context['borrow_requests']],
+            ['reader - Dune', 'other - Foundation'],
+        )
+
+    def test_missing_object(self):
+        self.assertEqual(self.client.get(reverse('author_view', kwargs={'name': 'Nobody'})).status_code, 404)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class LoginThrottleTest(TestCase):
+    def setUp(self):
+        UserProfile.objects.create_user(username='reader', password='correct horse')
+        self.throttle = FailureThrottle(3, 60, attempts_by_kind={'ip': 5})
+        patcher = mock.patch('myapp.forms.login_throttle', self.throttle)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def log_in(self, username, password, address='10.0.0.1'):
+        request = RequestFactory().post(reverse('login_view'), REMOTE_ADDR=address)
+        form = LoginViewForm({'username': username, 'password': password}, request=request)
+        return form.is_valid(), ' '.join(form.non_field_errors())
+
+    def test_user_locked_out(self):
+        for _ in range(3):
+            self.assertEqual(self.log_in('reader', 'wrong'), (False, 'Incorrect username or password.'))
+        valid, error = self.log_in('reader', 'correct horse', address='10.0.0.2')
+        self.assertFalse(valid)
+        self.assertIn('Too many failed login attempts', error)
+
+    def test_address_has_a_higher_limit(self):
+        for username in ['a', 'b', 'c', 'd']:
+            self.log_in(username, 'wrong')
+        self.assertEqual(self.log_in('reader', 'correct horse'), (True, ''))
+        self.log_in('e', 'wrong')
+        self.assertFalse(self.log_in('reader', 'correct horse')[0])
+        self.assertTrue(self.log_in('reader', 'correct horse', address='10.0.0.2')[0])
+
+    def test_success_clears_only_the_user(self):
+        self.log_in('reader', 'wrong')
+        self.log_in('reader', 'wrong')
+        self.assertTrue(self.log_in('reader', 'correct horse')[0])
+        self.assertNotIn('user:reader', self.throttle._failures)
+        self.assertEqual(len(self.throttle._failures['ip:10.0.0.1']), 2)
+
+    def test_key_cap_evicts_the_oldest(self):
+        throttle = FailureThrottle(3, 60, max_keys=2)
+        for key in ['user:a', 'user:b', 'user:a', 'user:c']:
+            throttle.failed(key)
+        self.assertEqual(list(throttle._failures), ['user:a', 'user:c'])
+
+
+class BorrowWorkflowTest(TestCase):
+    def setUp(self):
+        self.book = make_book()
+        self.user = UserProfile.objects.create(username='reader')
+        self.request = BorrowRequestModel.objects.create(book=self.book, borrower=self.user, request_date=date.today())
+
+    def test_full_loan(self):
+        approve_request(self.request)
+        take_book(self.request)
+        self.book.refresh_from_db()
+        self.assertEqual(self.request.status, BorrowRequestModel.COLLECTED)
+        self.assertIsNotNone(self.request.due_date)
+        self.assertFalse(self.book.available)
+
+        return_book(self.request)
+        self.book.refresh_from_db()
+        self.assertEqual(self.request.status, BorrowRequestModel.COMPLETE)
+        self.assertFalse(self.request.overdue)
+        self.assertTrue(self.book.available)
+
+    def test_invalid_transitions(self):
+        with self.assertRaises(InvalidTransition):
+            take_book(self.request)
+        decline_request(self.request)
+        with self.assertRaises(InvalidTransition):
+            approve_request(self.request)
+        self.assertEqual(self.request.status, BorrowRequestModel.DECLINED)
+
+    def test_take_unavailable_book(self):
+        Book.objects.filter(pk=self.book.pk).update(available=False)
+        approve_request(self.request)
+        with self.assertRaises(InvalidTransition):
+            take_book(self.request)
+        self.request.refresh_from_db()
+        self.assertEqual(self.request.status, BorrowRequestModel.APPROVED)
+
+
+@skipUnlessDBFeature('test_db_allows_multiple_connections')
+class BorrowWorkflowConcurrencyTest(TransactionTestCase):
+    THREADS = 8
+
+    def run_concurrently(self, function, arguments):
+        barrier = threading.Barrier(len(arguments))
+        outcomes = []
+
+        def worker(argument):
+            try:
+                barrier.wait()
+                function(argument)
+                outcomes.append(True)
+            except InvalidTransition:
+                outcomes.append(False)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(argument,)) for argument in arguments]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return outcomes
+
+    def test_one_book_is_taken_once(self):
+        book = make_book()
+        requests = []
+        for i in range(self.THREADS):
+            user = UserProfile.objects.create(username=f'reader{i}')
+            requests.append(BorrowRequestModel.objects.create(
+                book=book, borrower=user, request_date=date.today(), status=BorrowRequestModel.APPROVED,
+            ))
+
+        outcomes = self.run_concurrently(take_book, requests)
+
+        self.assertEqual(outcomes.count(True), 1)
+        self.assertEqual(BorrowRequestModel.objects.filter(status=BorrowRequestModel.COLLECTED).count(), 1)
+        self.assertEqual(BorrowRequestModel.objects.filter(status=BorrowRequestModel.APPROVED).count(), self.THREADS - 1)
+        book.refresh_from_db()
+        self.assertFalse(book.available)
+
+    def test_one_request_is_decided_once(self):
+        user = UserProfile.objects.create(username='reader')
+        request = BorrowRequestModel.objects.create(book=make_book(), borrower=user, request_date=date.today())
+        decisions = [approve_request, decline_request] * (self.THREADS // 2)
+
+        outcomes = self.run_concurrently(lambda decide: decide(BorrowRequestModel(pk=request.pk)), decisions)
+
+        self.assertEqual(outcomes.count(True), 1)
+
+
+class BenchmarkBorrowIndexesTest(TransactionTestCase):
+    # the command changes the schema, which SQLite cannot do inside a test transaction
+    def index_names(self):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, BorrowRequestModel._meta.db_table)
+        return {name for name, constraint in constraints.items() if constraint['index']}
+
+    def run_benchmark(self):
+        call_command('benchmark_borrow_indexes', requests=50, users=5, books=5, repeat=1, stdout=StringIO())
+
+    def test_indexes_restored(self):
+        indexes = {index.name for index in BorrowRequestModel._meta.indexes}
+        self.run_benchmark()
+        self.assertLessEqual(indexes, self.index_names())
+        self.assertFalse(Book.objects.exists())
+        self.assertFalse(BorrowRequestModel.objects.exists())
+
+    def test_indexes_restored_after_failure(self):
+        indexes = {index.name for index in BorrowRequestModel._meta.indexes}
+        with mock.patch(
+            'myapp.management.commands.benchmark_borrow_indexes.Command.report', side_effect=RuntimeError,
+        ), self.assertRaises(RuntimeError):
+            self.run_benchmark()
+        self.assertLessEqual(indexes, self.index_names())
+        self.assertFalse(UserProfile.objects.exists())
+
+
+class SweepOverdueTest(TestCase):
+    def setUp(self):
+        borrower = UserProfile.objects.create(username='reader')
+        today = date.today()
+
+        def loan(days_late, status=BorrowRequestModel.COLLECTED):
+            return BorrowRequestModel.objects.create(
+                book=make_book(title=f'Book {days_late} {status}', isbn=f'{days_late}-{status}'), borrower=borrower,
+                status=status, request_date=today, due_date=today - timedelta(days=days_late),
+            )
+
+        self.long_late, self.late, self.due = loan(10), loan(3), loan(-7)
+        self.returned = loan(10, BorrowRequestModel.COMPLETE)
+
+    def sweep(self, *args):
+        call_command('sweep_overdue', *args, stdout=StringIO())
+        return set(BorrowRequestModel.objects.filter(overdue=True))
+
+    def test_single_update(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.sweep(), {self.long_late, self.late})
+        table = BorrowRequestModel._meta.db_table
+        updates = [query for query in queries if query['sql'].startswith(f'UPDATE "{table}"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(JobCheckpoint.objects.get(name='sweep_overdue').position, date.today().isoformat())
+
+    def test_resume_from_checkpoint(self):
+        JobCheckpoint.objects.create(name='sweep_overdue', position=(date.today() - timedelta(days=5)).isoformat())
+        self.assertEqual(self.sweep(), {self.late})
+        self.assertEqual(self.sweep('--full'), {self.long_late, self.late})
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class LoadtestTest(TransactionTestCase):
+    def test_smoke_run(self):
+        # against the test database instead of one of its own
+        stdout = StringIO()
+        with mock.patch.object(connection.creation, 'create_test_db', return_value=connection.settings_dict['NAME']), \
+                mock.patch.object(connection.creation, 'destroy_test_db'):
+            call_command(
+                'loadtest', requests=40, warmup=5, concurrency=1, books=20, readers=3, stdout=stdout, stderr=StringIO(),
+            )
+        report = json.loads(stdout.getvalue())
+        self.assertEqual(report['total']['errors'], 0)
+        self.assertGreaterEqual(report['total']['requests'], 40)
+        self.assertIn('main', report['endpoints'])
+
+
+class RequestTimingTest(TestCase):
+    def setUp(self):
+        make_books(3)
+
+    def test_off_by_default(self):
+        response = self.client.get(reverse('main_view'))
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(REQUEST_TIMING=True)
+    def test_opted_in(self):
+        with self.assertLogs('myapp.timing', 'INFO') as logs:
+            response = self.client.get(reverse('main_view'))
+        self.assertIn('db;dur=', response['Server-Timing'])
+        timings = json.loads(logs.records[0].getMessage())
+        self.assertEqual((timings['path'], timings['status']), (reverse('main_view'), 200))
+        self.assertGreater(timings['queries'], 0)
+
+
+class RequestQueueTest(TestCase):
+    def setUp(self):
+        self.client.force_login(UserProfile.objects.create(username='librarian', is_librarian=True))
+        alice, bob = UserProfile.objects.create(username='alice'), UserProfile.objects.create(username='bob')
+        book = make_book()
+        for borrower, status, day in [
+            (alice, BorrowRequestModel.PENDING, 1), (alice, BorrowRequestModel.APPROVED, 2),
+            (bob, BorrowRequestModel.PENDING, 3), (bob, BorrowRequestModel.DECLINED, 20),
+        ]:
+            BorrowRequestModel.objects.create(book=book, borrower=borrower, status=status, request_date=date(2024, 1, day))
+
+    def queue(self, **params):
+        response = self.client.get(reverse('requests_view'), params)
+        counts = {label: count for _, label, count in response.context['status_counts']}
+        return [(str(request), request.status) for request in response.context['requests']], counts
+
+    def test_status_filter_and_counts(self):
+        requests, counts = self.queue(status=BorrowRequestModel.PENDING)
+        self.assertEqual(requests, [('bob - Dune', 1), ('alice - Dune', 1)])
+        self.assertEqual((counts['All'], counts['Pending'], counts['Declined'], counts['Complete']), (4, 2, 1, 0))
+
+    def test_counts_follow_the_other_filters(self):
+        requests, counts = self.queue(borrower='ali', date_to='2024-01-10')
+        self.assertEqual(requests, [('alice - Dune', 2), ('alice - Dune', 1)])
+        self.assertEqual((counts['All'], counts['Pending'], counts['Declined']), (2, 1, 0))
+
+    def test_invalid_filter(self):
+        requests, counts = self.queue(date_from='not a date')
+        self.assertEqual((requests, counts['All']), ([], 0))
+
+
+class RequestEventsTest(TestCase):
+    def setUp(self):
+        self.reader = UserProfile.objects.create(username='reader')
+
+    def test_no_stream_under_wsgi(self):
+        self.client.force_login(self.reader)
+        self.assertEqual(self.client.get(reverse('request_events_view')).status_code, 204)
+        response = self.client.get(reverse('profile_view', kwargs={'username': 'reader'}))
+        self.assertFalse(response.context['live_updates'])
+        self.assertNotContains(response, reverse('request_events_view'))
+
+    async def test_anonymous_under_asgi(self):
+        response = await self.async_client.get(reverse('request_events_view'))
+        self.assertEqual(response.status_code, 403)
+
+
+class ArchiveRequestsTest(TestCase):
+    def setUp(self):
+        reader, book = UserProfile.objects.create(username='reader'), make_book()
+        old, recent = date.today() - timedelta(days=400), date.today()
+
+        def borrow_request(status, day, complete_date=None):
+            return BorrowRequestModel.objects.create(
+                book=book, borrower=reader, status=status, request_date=day, complete_date=complete_date,
+            ).pk
+
+        self.finished = [
+            borrow_request(BorrowRequestModel.COMPLETE, old, old) for _ in range(3)
+        ] + [borrow_request(BorrowRequestModel.DECLINED, old) for _ in range(2)]
+        self.kept = [
+            borrow_request(BorrowRequestModel.COMPLETE, old, recent), borrow_request(BorrowRequestModel.PENDING, old),
+        ]
+
+    def archive(self):
+        stdout = StringIO()
+        call_command('archive_requests', batch_size=2, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_batches(self):
+        output = self.archive()
+        self.assertIn('2 requests archived...\n4 requests archived...\n5 requests archived...\n', output)
+        self.assertEqual(sorted(BorrowRequestModel.objects.values_list('pk', flat=True)), self.kept)
+        self.assertEqual(sorted(BorrowRequestArchive.objects.values_list('pk', flat=True)), self.finished)
+        self.assertEqual(JobCheckpoint.objects.get(name='archive_requests').position, '')
+
+    def test_resume(self):
+        # a run that stopped after the batch ending at the third request, the
+        # next batch already copied but not yet deleted
+        JobCheckpoint.objects.create(name='archive_requests', position=str(self.finished[2]))
+        BorrowRequestArchive.objects.create(**BorrowRequestModel.objects.filter(pk=self.finished[3]).values(
+            *ARCHIVE_FIELDS
+        ).get())
+        self.assertIn('2 requests archived.', self.archive())
+        self.assertEqual(sorted(BorrowRequestArchive.objects.values_list('pk', flat=True)), self.finished[3:])
+        # the checkpoint is cleared at the end, the next run catches up
+        self.assertIn('3 requests archived.', self.archive())
+        self.assertEqual(BorrowRequestArchive.objects.count(), 5)
+
+
+class CirculationStatsTest(TestCase):
+    def setUp(self):
+        self.reader = UserProfile.objects.create(username='reader')
+        self.dune, self.foundation = make_book(), make_book(title='Foundation', isbn='9780553293357')
+        self.dune.authors.add(Author.objects.create(name='Frank Herbert', bio=''))
+        self.dune.genre.add(Genre.objects.create(name='Science Fiction'))
+        self.today = date.today()
+
+    def loan(self, book, days_ago, archived=False, overdue=False):
+        # collected LOAN_PERIOD + 4 days before its return
+        returned = self.today - timedelta(days=days_ago)
+        loan = BorrowRequestModel.objects.create(
+            book=book, borrower=self.reader, status=BorrowRequestModel.COMPLETE, overdue=overdue,
+            request_date=returned - timedelta(days=30), due_date=returned - timedelta(days=4),
+            complete_date=returned,
+        )
+        if archived:
+            BorrowRequestArchive.objects.create(**BorrowRequestModel.objects.values(*ARCHIVE_FIELDS).get(pk=loan.pk))
+            loan.delete()
+
+    def rollup(self):
+        stdout = StringIO()
+        call_command('rollup_circulation', stdout=stdout)
+        return stdout.getvalue()
+
+    def test_rollup_reads_hot_table_and_archive(self):
+        self.loan(self.dune, 3)
+        self.loan(self.dune, 3, archived=True, overdue=True)
+        self.loan(self.foundation, 40, archived=True)
+        self.rollup()
+        self.assertEqual(
+            sorted(BookCirculation.objects.values_list('book__title', 'loans', 'overdue')),
+            [('Dune', 2, 1), ('Foundation', 1, 0)],
+        )
+        self.assertEqual(list(GenreCirculation.objects.values_list('genre__name', 'loans')), [('Science Fiction', 2)])
+        self.assertEqual(list(AuthorCirculation.objects.values_list('author__name', 'loans')), [('Frank Herbert', 2)])
+        position = JobCheckpoint.objects.get(name='rollup_circulation').position
+        self.assertEqual(position, (self.today - timedelta(days=1)).isoformat())
+
+    def test_rollup_resumes_after_checkpoint(self):
+        self.loan(self.dune, 5)
+        self.rollup()
+        self.assertIn('0 days rolled up.', self.rollup())
+        # returns are dated the day they happen, so only days after the checkpoint are read again
+        JobCheckpoint.objects.filter(name='rollup_circulation').update(
+            position=(self.today - timedelta(days=3)).isoformat(),
+        )
+        self.loan(self.foundation, 2)
+        self.loan(self.foundation, 4)
+        self.assertIn('2 days rolled up.', self.rollup())
+        self.assertEqual(
+            sorted(BookCirculation.objects.values_list('book__title', 'day')),
+            [('Dune', self.today - timedelta(days=5)), ('Foundation', self.today - timedelta(days=2))],
+        )
+
+    def test_windows(self):
+        self.loan(self.dune, 3, overdue=True)
+        self.loan(self.foundation, 40)
+        self.loan(self.foundation, 400)
+        self.rollup()
+        week, year, all_time = circulation_stats(7), circulation_stats(365), circulation_stats()
+        self.assertEqual((week['loans'], week['overdue_rate']), (1, 1.0))
+        self.assertEqual([book['book__title'] for book in week['books']], ['Dune'])
+        self.assertEqual([(book['book__title'], book['loans']) for book in year['books']], [('Dune', 1), ('Foundation', 1)])
+        self.assertEqual([(book['book__title'], book['loans']) for book in all_time['books']], [('Foundation', 2), ('Dune', 1)])
+        self.assertEqual(all_time['average_loan_days'], float((LOAN_PERIOD + timedelta(days=4)).days))
+
+    def test_days_parameter(self):
+        librarian = UserProfile.objects.create(username='librarian', is_librarian=True)
+        self.client.force_login(librarian)
+        for days, stats_days in [('7', 7), ('all', None), ('\u00b2', None), ('-3', None), ('99999999999', None)]:
+            with self.subTest(days=days):
+                response = self.client.get(reverse('stats_view'), {'days': days})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.context['days'], stats_days)
+        for days, status in [('7', 200), ('99999999999', 200), ('abc', 400), ('\u00b2', 400), ('-3', 400)]:
+            with self.subTest(days=days):
+                self.assertEqual(self.client.get(reverse('api-stats-list'), {'days': days}).status_code, status)
+
+
+class CollectStaticTest(SimpleTestCase):
+    def test_compressed_siblings(self):
+        with tempfile.TemporaryDirectory() as static_root, override_settings(STATIC_ROOT=static_root):
+            # the app's own files, brotli at its best quality is slow on the admin's
+            call_command('collectstatic', interactive=False, verbosity=0, ignore_patterns=['admin', 'rest_framework'])
+            stylesheet = staticfiles_storage.stored_name('myapp/vendor/bootstrap/bootstrap.min.css')
+            self.assertNotEqual(stylesheet, 'myapp/vendor/bootstrap/bootstrap.min.css')
+            content = (Path(static_root) / stylesheet).read_bytes()
+            self.assertEqual(gzip.decompress((Path(static_root) / f'{stylesheet}.gz').read_bytes()), content)
+            if brotli is not None:
+                self.assertEqual(brotli.decompress((Path(static_root) / f'{stylesheet}.br').read_bytes()), content)
+
+
+class KeysetPaginatorTest(TestCase):
+    def setUp(self):
+        self.books = make_books(7)
+        self.paginator = KeysetPaginator(('title', 'pk'), per_page=3)
+
+    def titles(self, page):
+        return [book.title for book in page]
+
+    def test_next_and_previous(self):
+        first = self.paginator.paginate(Book.objects.all())
+        self.assertEqual(self.titles(first), ['Book 000', 'Book 001', 'Book 002'])
+        self.assertFalse(first.has_previous())
+        second = self.paginator.paginate(Book.objects.all(), first.next_cursor)
+        self.assertEqual(self.titles(second), ['Book 003', 'Book 004', 'Book 005'])
+        last = self.paginator.paginate(Book.objects.all(), second.next_cursor)
+        self.assertEqual(self.titles(last), ['Book 006'])
+        self.assertFalse(last.has_next())
+
+        back = self.paginator.paginate(Book.objects.all(), last.previous_cursor)
+        self.assertEqual(self.titles(back), self.titles(second))
+        back = self.paginator.paginate(Book.objects.all(), back.previous_cursor)
+        self.assertEqual(self.titles(back), self.titles(first))
+        self.assertTrue(back.has_next())
+
+    def test_ties_broken_by_pk(self):
+        # every book has the same publisher, so only the pk orders them
+        paginator = KeysetPaginator(('-publisher', 'pk'), per_page=2)
+        seen, cursor = [], None
+        while True:
+            page = paginator.paginate(Book.objects.all(), cursor)
+            seen += [book.pk for book in page]
+            if not page.has_next():
+                break
+            cursor = page.next_cursor
+        self.assertEqual(seen, sorted(book.pk for book in self.books))
+
+    def test_malformed_and_tampered_cursors(self):
+        tampered = [
+            'not base64!', base64.urlsafe_b64encode(b'[1, 2]').decode(),
+            base64.urlsafe_b64encode(b'{"v": ["x"], "r": false}').decode(),
+            base64.urlsafe_b64encode(b'{"v": ["x", "abc"], "r": false}').decode(),
+            base64.urlsafe_b64encode(b'{"v": ["x", null], "r": false}').decode(),
+        ]
+        for cursor in tampered:
+            with self.subTest(cursor=cursor), self.assertRaises(InvalidCursor):
+                self.paginator.paginate(Book.objects.all(), cursor)
+
+    def test_tampered_cursor_is_not_found(self):
+        cursor = base64.urlsafe_b64encode(b'{"v": ["x", "abc"], "r": false}').decode()
+        self.assertEqual(self.client.get(reverse('main_view'), {'cursor': cursor}).status_code, 404)
+
+
+
+class FallbackSearchTest(TestCase):
+    # the search of backends without full-text search, run on any backend here
+    def setUp(self):
+        self.by_title = make_book(title='Dune', isbn='1')
+        self.by_author = make_book(title='Children', isbn='2')
+        self.by_author.authors.add(Author.objects.create(name='Dune Herbert', bio=''))
+        self.by_genre = make_book(title='Arrakis', isbn='3')
+        self.by_genre.genre.add(Genre.objects.create(name='Dune Saga'))
+        make_book(title='Foundation', isbn='4')
+
+    def test_title_outranks_author_and_genre(self):
+        books = list(_fallback_search(['dune']).order_by('-rank', 'pk'))
+        self.assertEqual(books, [self.by_title, self.by_author, self.by_genre])
+        self.assertGreater(books[0].rank, books[1].rank)
+        self.assertGreater(books[1].rank, books[2].rank)
+
+    def test_every_term_must_match(self):
+        self.assertEqual(list(_fallback_search(['dune', 'children'])), [self.by_author])
+
+    def test_keyset_pages(self):
+        # make_book() gives every book the same publisher, so all of them tie
+        paginator = KeysetPaginator(('-rank', 'pk'), per_page=3)
+        first = paginator.paginate(_fallback_search(['ace']))
+        second = paginator.paginate(_fallback_search(['ace']), first.next_cursor)
+        self.assertEqual([book.pk for book in first] + [book.pk for book in second], sorted(
+            Book.objects.values_list('pk', flat=True)
+        ))
+        self.assertFalse(second.has_next())
+
+    def test_empty_query(self):
+        self.assertFalse(search_books('   ').exists())
+        response = self.client.get(reverse('search_view'), {'q': ''})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['books']), [])
+
+
+class ImportCatalogTest(TestCase):
+    def setUp(self):
+        self.herbert = Author.objects.create(name='Frank Herbert', bio='')
+        make_book()
+
+    def run_import(self, *lines):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'books.jsonl'
+            path.write_text('\n'.join(lines), encoding='utf-8')
+            stdout, stderr = StringIO(), StringIO()
+            call_command('import_catalog', str(path), stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def record(self, **fields):
+        return json.dumps({
+            'title': 'Foundation', 'isbn': '9780553293357', 'summary': '', 'publisher': 'Gnome Press',
+            'published_date': '1951-05-01', 'authors': ['Isaac Asimov'], 'genres': ['Science Fiction'], **fields,
+        })
+
+    def test_report(self):
+        stdout, stderr = self.run_import(
+            self.record(),
+            self.record(title='Foundation Again'),
+            self.record(title='Dune', isbn='1'),
+            self.record(isbn='0441013597'),
+            '{"title": ',
+            '[1, 2]',
+            self.record(title='Untitled', isbn='2', publisher=None),
+            self.record(title='Unknown', isbn='3', authors=[]),
+        )
+        self.assertIn('Imported 1 books, skipped 7.', stdout)
+        for line, reason in [
+            (2, 'duplicate ISBN 9780553293357 in file'), (3, 'title "Dune" already in catalog'),
+            (4, 'duplicate title "Foundation" in file'), (5, 'invalid JSON'), (6, 'malformed record (not an object)'),
+            (7, 'malformed record'), (8, 'no authors'),
+        ]:
+            self.assertIn(f'line {line}: skipped, {reason}', stderr)
+
+    def test_summaries_and_versions(self):
+        navigation, catalog = get_version('navigation'), get_version('catalog')
+        herbert_updated_at = self.herbert.updated_at
+        self.run_import(
+            self.record(authors=['Isaac Asimov', 'Frank Herbert']),
+            self.record(title='Foundation and Empire', isbn='9780553293371', genres=[]),
+        )
+        book = Book.objects.get(isbn='9780553293357')
+        self.assertEqual(book.author_names, ['Frank Herbert', 'Isaac Asimov'])
+        self.assertEqual(book.genre_names, ['Science Fiction'])
+        self.assertEqual(Book.objects.get(isbn='9780553293371').genre_names, [])
+        self.assertGreater(get_version('navigation'), navigation)
+        self.assertGreater(get_version('catalog'), catalog)
+        self.herbert.refresh_from_db()
+        self.assertGreater(self.herbert.updated_at, herbert_updated_at)
+
+
+class ApiTest(TestCase):
+    def setUp(self):
+        self.books = make_books(5)
+
+    def test_not_modified(self):
+        url = reverse('api-book-list')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.books[0].title = 'Dune'
+        self.books[0].save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_etag_per_user(self):
+        url = reverse('api-borrow-request-list')
+        reader = UserProfile.objects.create(username='reader')
+        BorrowRequestModel.objects.create(book=self.books[0], borrower=reader, request_date=date.today())
+        self.client.force_login(reader)
+        response = self.client.get(url)
+        self.assertEqual(len(response.json()['results']), 1)
+        self.client.force_login(UserProfile.objects.create(username='other'))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], [])
+
+    def test_cursor_pages(self):
+        url, isbns = reverse('api-book-list') + '?page_size=2', []
+        while url:
+            page = self.client.get(url).json()
+            self.assertLessEqual(len(page['results']), 2)
+            isbns += [book['isbn'] for book in page['results']]
+            url = page['next']
+        self.assertEqual(isbns, [book.isbn for book in self.books])
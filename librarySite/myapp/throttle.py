@@ -0,0 +1,85 @@
+import threading
+import time
+from collections import deque
+from itertools import islice
+
+from django.conf import settings
+
+LOGIN_THROTTLE_ATTEMPTS = getattr(settings, 'LOGIN_THROTTLE_ATTEMPTS', 5)
+LOGIN_THROTTLE_WINDOW = getattr(settings, 'LOGIN_THROTTLE_WINDOW', 60 * 5)
+# one address may be a whole office behind NAT or a proxy, so it gets far more
+# attempts than one account before everyone on it is locked out
+LOGIN_THROTTLE_IP_ATTEMPTS = getattr(settings, 'LOGIN_THROTTLE_IP_ATTEMPTS', 100)
+LOGIN_THROTTLE_MAX_KEYS = 10000
+
+
+class FailureThrottle:
+    """
+    In-process sliding window of failed attempts per key. Checking it costs
+    no hashing and no I/O, so refused attempts are nearly free; being
+    per-process, each worker counts on its own. Keys are "kind:value";
+    attempts_by_kind overrides the limit for some kinds.
+    """
+
+    def __init__(self, attempts, window, max_keys=LOGIN_THROTTLE_MAX_KEYS, attempts_by_kind=None):
+        self.attempts = attempts
+        self.attempts_by_kind = attempts_by_kind or {}
+        self.window = window
+        self.max_keys = max_keys
+        self._failures = {}
+        self._lock = threading.Lock()
+
+    def limit(self, key):
+        return self.attempts_by_kind.get(key.partition(':')[0], self.attempts)
+
+    def _recent(self, key, now):
+        failures = self._failures.get(key)
+        while failures and failures[0] <= now - self.window:
+            failures.popleft()
+        return failures
+
+    def retry_after(self, *keys):
+        # seconds until the first of the keys may try again, 0 when none is blocked
+        now = time.monotonic()
+        wait = 0
+        with self._lock:
+            for key in keys:
+                failures = self._recent(key, now)
+                if failures and len(failures) >= self.limit(key):
+                    wait = max(wait, failures[0] + self.window - now)
+        return int(wait) + 1 if wait else 0
+
+    def failed(self, *keys):
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                # moved to the end, so the keys stay ordered by their last failure
+                failures = self._failures.pop(key, None) or deque(maxlen=self.limit(key))
+                failures.append(now)
+                self._failures[key] = failures
+            if len(self._failures) > self.max_keys:
+                self._prune(now)
+
+    def succeeded(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._failures.pop(key, None)
+
+    def _prune(self, now):
+        for key in [key for key, failures in self._failures.items() if not self._recent(key, now)]:
+            del self._failures[key]
+        # still too many recent keys: forget the ones that failed longest ago
+        for key in list(islice(self._failures, max(len(self._failures) - self.max_keys, 0))):
+            del self._failures[key]
+
+
+login_throttle = FailureThrottle(
+    LOGIN_THROTTLE_ATTEMPTS, LOGIN_THROTTLE_WINDOW, attempts_by_kind={'ip': LOGIN_THROTTLE_IP_ATTEMPTS},
+)
+
+
+def login_throttle_keys(request, username):
+    keys = [f'user:{username.lower()}']
+    if request is not None and request.META.get('REMOTE_ADDR'):
+        keys.append(f'ip:{request.META["REMOTE_ADDR"]}')
+    return keys
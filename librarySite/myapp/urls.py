@@ -1,25 +1,47 @@
-from django.urls import path
-from . import views
+from django.conf import settings
+from django.urls import include, path
+from rest_framework.routers import DefaultRouter
+
+from . import api, views
+
+router = DefaultRouter()
+router.register('books', api.BookViewSet, basename='api-book')
+router.register('authors', api.AuthorViewSet, basename='api-author')
+router.register('genres', api.GenreViewSet, basename='api-genre')
+router.register('borrow-requests', api.BorrowRequestViewSet, basename='api-borrow-request')
+router.register('stats', api.CirculationStatsViewSet, basename='api-stats')
+
+
+def read_view(view):
+    # under ASGI, ASYNC_VIEWS serves the async variant of a read-heavy view
+    if getattr(settings, 'ASYNC_VIEWS', False):
+        view = getattr(views, f'Async{view.__name__}')
+    return view.as_view()
+
 
 urlpatterns = [
-    path('', views.MainView.as_view(), name='main_view'),
+    path('', read_view(views.MainView), name='main_view'),
+    path('search/', views.SearchView.as_view(), name='search_view'),
 
     path('book/create-book/', views.CreateBookView.as_view(), name='create_book_view'),
     path('book/update-book/<str:isbn>/', views.UpdateBookView.as_view(), name='update_book_view'),
     path('book/delete-book/<str:isbn>/', views.DeleteBookView.as_view(), name='delete_book_view'),
-    path('book/<str:isbn>/', views.BookDetailView.as_view(), name='book_detail_view'),
+    path('book/<str:isbn>/', read_view(views.BookDetailView), name='book_detail_view'),
 
+    path('authors/', views.AuthorListView.as_view(), name='author_list_view'),
     path('author/create-author/', views.CreateAuthorView.as_view(), name='create_author_view'),
     path('author/update-author/<str:name>/', views.UpdateAuthorView.as_view(), name='update_author_view'),
     path('author/delete-author/<str:name>/', views.DeleteAuthorView.as_view(), name='delete_author_view'),
-    path('author/<str:name>/', views.AuthorView.as_view(), name='author_view'),
+    path('author/<str:name>/', read_view(views.AuthorView), name='author_view'),
 
     path('genre/create-genre/', views.CreateGenreView.as_view(), name='create_genre_view'),
     path('genre/update-genre/<str:name>/', views.UpdateGenreView.as_view(), name='update_genre_view'),
     path('genre/delete-genre/<str:name>/', views.DeleteGenreView.as_view(), name='delete_genre_view'),
-    path('genre/<str:name>/', views.GenreView.as_view(), name='genre_view'),
+    path('genre/<str:name>/', read_view(views.GenreView), name='genre_view'),
 
     path('requests/', views.RequestsView.as_view(), name='requests_view'),
+    path('requests/events/', views.RequestEventsView.as_view(), name='request_events_view'),
+    path('stats/', views.StatsView.as_view(), name='stats_view'),
     path('borrow/<str:isbn>/', views.CreateBorrowRequestView.as_view(), name='create_borrow_request_view'),
     path('check-borrow/<str:id>/', views.BorrowRequestView.as_view(), name='borrow_request_view'),
     path('request-decline/<str:id>/', views.RequestDeclineView.as_view(), name='request_decline_view'),
@@ -27,7 +49,15 @@ urlpatterns = [
     path('take-book/<str:id>/', views.TakeBookView.as_view(), name='take_book_view'),
     path('return-book/<str:id>/', views.ReturnBookView.as_view(), name='return_book_view'),
 
-    path('profile/<str:username>/', views.ProfileView.as_view(), name='profile_view'),
+    path('autocomplete/authors/', views.AuthorAutocompleteView.as_view(), name='author_autocomplete_view'),
+    path('autocomplete/genres/', views.GenreAutocompleteView.as_view(), name='genre_autocomplete_view'),
+    path('autocomplete/borrowers/', views.BorrowerAutocompleteView.as_view(), name='borrower_autocomplete_view'),
+
+    path('api/', include(router.urls)),
+    path('export/<str:dataset>/', views.ExportView.as_view(), name='export_view'),
+
+    path('profile/<str:username>/', read_view(views.ProfileView), name='profile_view'),
+    path('profile/<str:username>/history/', views.RequestHistoryView.as_view(), name='request_history_view'),
     path('login/', views.LoginView.as_view(), name='login_view'),
     path('register/', views.RegisterView.as_view(), name='register_view'),
     path('logout/', views.LogoutView.as_view(), name='logout_view'),
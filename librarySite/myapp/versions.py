@@ -0,0 +1,40 @@
+from time import time
+
+from django.core.cache import cache
+
+
+def _version_key(namespace):
+    return f'version:{namespace}'
+
+
+def _now():
+    return int(time() * 1000)
+
+
+def get_version(namespace):
+    # Versions are millisecond timestamps, so a version lost on cache eviction
+    # is replaced by a newer one and never collides with stale cached entries.
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        version = _now()
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+async def aget_version(namespace):
+    key = _version_key(namespace)
+    version = await cache.aget(key)
+    if version is None:
+        version = _now()
+        if not await cache.aadd(key, version, timeout=None):
+            version = await cache.aget(key, version)
+    return version
+
+
+def bump_version(*namespaces):
+    keys = [_version_key(namespace) for namespace in namespaces]
+    current = cache.get_many(keys)
+    now = _now()
+    cache.set_many({key: max(now, current.get(key, 0) + 1) for key in keys}, timeout=None)
@@ -1,23 +1,50 @@
-from datetime import timedelta
-
-from django.contrib.auth import login, logout
-from django.http import HttpResponseRedirect, HttpResponseForbidden
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user, login, logout
+from django.db.models import Count, Q, prefetch_related_objects
+from django.http import HttpResponse, HttpResponseRedirect, HttpResponseForbidden, JsonResponse, StreamingHttpResponse, Http404
 from django.shortcuts import render, redirect
 from django.urls import reverse_lazy, reverse
 from django.views import View
 from django.views.generic import CreateView, ListView, DetailView
 
+from .asyncviews import AsyncReadMixin, served_by_asgi
+from .autocomplete import lookup_choices
+from .conditional import ConditionalGetMixin
+from .pagecache import AnonymousPageCacheMixin
+from .events import LIBRARIANS_CHANNEL, publish_borrow_request, stream_events, user_channel
+from .exports import CONTENT_TYPES, EXPORTS, aiter_lines, export_lines
+from .loaders import get_loader
 from .forms import *
-from .models import UserProfile, Book, Author, Genre, BorrowRequestModel
+from .models import UserProfile, Book, Author, Genre, BorrowRequestArchive, BorrowRequestModel
+from .pagination import KeysetPaginationMixin
+from .recommendations import get_recommendations
+from .search import search_books
+from .stats import circulation_stats, parse_days
+from .services import InvalidTransition, approve_request, decline_request, return_book, take_book
 
 
 # MAIN VIEW
-class MainView(ListView):
+class MainView(AnonymousPageCacheMixin, KeysetPaginationMixin, ListView):
     template_name = 'books/index.html'
     context_object_name = 'books'
+    keyset_ordering = ('title', 'pk')
+
+    def get_queryset(self):
+        return Book.objects.defer('search_vector')
+
+
+class SearchView(KeysetPaginationMixin, ListView):
+    template_name = 'books/search_view.html'
+    context_object_name = 'books'
+    keyset_ordering = ('-rank', 'pk')
 
     def get_queryset(self):
-        return Book.objects.all()
+        return search_books(self.request.GET.get('q', '')).defer('search_vector')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['query'] = self.request.GET.get('q', '')
+        return context
 
 
 # VIEWS FOR USER FUNCTIONALITY (LOGIN, REGISTRATION, PROFILE, CHANGE USER DATA, CHANGE PASSWORD, LOGOUT)
@@ -29,13 +56,12 @@ class LoginView(View):
         return render(request, self.template_name, {'form': form})
 
     def post(self, request):
-        form = LoginViewForm(request.POST)
+        form = LoginViewForm(request.POST, request=request)
         if form.is_valid():
-            user = authenticate(**form.cleaned_data)
-            if user is not None:
-                login(request, user)
-                url = reverse('profile_view', kwargs={'username': user.username})
-                return HttpResponseRedirect(url)
+            user = form.get_user()
+            login(request, user)
+            url = reverse('profile_view', kwargs={'username': user.username})
+            return HttpResponseRedirect(url)
         return render(request, self.template_name, {'form': form})
 
 
@@ -61,16 +87,59 @@ class ProfileView(DetailView):
     context_object_name = 'user'
 
     def get_object(self, queryset=None):
-        username = self.kwargs.get('username')
-        return self.model.objects.get(username=username)
+        return get_loader(self.request).get(self.model, 'username', self.kwargs.get('username'))
+
+    def get_requests_queryset(self, user):
+        # the user's own requests and, for librarians, the pending queue in one query
+        requests = BorrowRequestModel.objects.select_related('book').order_by('pk')
+        if user.is_librarian:
+            return requests.filter(Q(borrower=user) | Q(status=BorrowRequestModel.PENDING))
+        return requests.filter(borrower=user)
+
+    @staticmethod
+    def set_borrowers(requests, borrowers):
+        for borrow_request in requests:
+            borrow_request.borrower = borrowers[borrow_request.borrower_id]
+
+    def get_requests_context(self, user, requests):
+        context = {
+            'user_requests': [request for request in requests if request.borrower_id == user.pk],
+            'live_updates': served_by_asgi(self.request),
+        }
+        if user.is_librarian:
+            context['borrow_requests'] = [request for request in requests if request.status == BorrowRequestModel.PENDING]
+        return context
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        user = self.get_object()
-        if user.is_librarian:
-            context['borrow_requests'] = BorrowRequestModel.objects.filter(status=1)
-        user_requests = BorrowRequestModel.objects.filter(borrower=user)
-        context['user_requests'] = user_requests
+        requests = list(self.get_requests_queryset(self.object))
+        # the profile's user is in the loader already, only other borrowers are fetched
+        self.set_borrowers(requests, get_loader(self.request).load_many(
+            UserProfile, {borrow_request.borrower_id for borrow_request in requests}
+        ))
+        context.update(self.get_requests_context(self.object, requests))
+        return context
+
+
+class RequestHistoryView(KeysetPaginationMixin, ListView):
+    template_name = 'user/request_history_view.html'
+    context_object_name = 'requests'
+    keyset_ordering = ('-request_date', '-pk')
+
+    def dispatch(self, request, *args, **kwargs):
+        viewer = request.user
+        if not viewer.is_authenticated or not (
+                viewer.username == kwargs['username'] or viewer.is_librarian or viewer.is_staff):
+            return redirect('main_view')
+        self.profile = get_loader(request).get(UserProfile, 'username', kwargs['username'])
+        return super().dispatch(request, *args, **kwargs)
+
+    def get_queryset(self):
+        return BorrowRequestArchive.objects.filter(borrower=self.profile).select_related('book').defer('book__search_vector')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['profile'] = self.profile
         return context
 
 
@@ -137,20 +206,25 @@ class LogoutView(View):
 
 
 # VIEWS FOR GENRE FUNCTIONALITY(GENRE VIEW, CREATE, UPDATE, DELETE)
-class GenreView(DetailView):
+class GenreView(AnonymousPageCacheMixin, ConditionalGetMixin, KeysetPaginationMixin, DetailView):
     model = Genre
     template_name = 'genres/genre_view.html'
     context_object_name = 'genre'
+    page_cache_kind = 'genre'
+    page_cache_kwarg = 'name'
+    keyset_ordering = ('title', 'pk')
+
+    def get_last_modified(self):
+        return self.get_object().updated_at
 
     def get_object(self, queryset=None):
-        name = self.kwargs.get('name')
-        return self.model.objects.get(name=name)
+        return get_loader(self.request).get(self.model, 'name', self.kwargs.get('name'))
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        cur_genre = self.get_object()
-        context['books'] = Book.objects.filter(genre=cur_genre)
-        context['genre'] = cur_genre
+        page = self.paginate_keyset(Book.objects.filter(genre=self.object).defer('search_vector'))
+        context['books'] = page.object_list
+        context['page_obj'] = page
         return context
 
 
@@ -210,21 +284,36 @@ class DeleteGenreView(View):
         return HttpResponseRedirect(url)
 
 
-# VIEWS FOR AUTHOR FUNCTIONALITY(AUTHOR VIEW, CREATE, UPDATE, DELETE)
-class AuthorView(DetailView):
+# VIEWS FOR AUTHOR FUNCTIONALITY(AUTHOR LIST, AUTHOR VIEW, CREATE, UPDATE, DELETE)
+class AuthorListView(KeysetPaginationMixin, ListView):
+    template_name = 'authors/author_list_view.html'
+    context_object_name = 'authors_page'
+    keyset_ordering = ('name', 'pk')
+    paginate_by = 50
+
+    def get_queryset(self):
+        return Author.objects.only('name')
+
+
+class AuthorView(AnonymousPageCacheMixin, ConditionalGetMixin, KeysetPaginationMixin, DetailView):
     model = Author
     template_name = 'authors/author_view.html'
     context_object_name = 'author'
+    page_cache_kind = 'author'
+    page_cache_kwarg = 'name'
+    keyset_ordering = ('title', 'pk')
+
+    def get_last_modified(self):
+        return self.get_object().updated_at
 
     def get_object(self, queryset=None):
-        name = self.kwargs.get('name')
-        return self.model.objects.get(name=name)
+        return get_loader(self.request).get(self.model, 'name', self.kwargs.get('name'))
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        cur_author = self.get_object()
-        context['books'] = Book.objects.filter(authors=cur_author)
-        context['author'] = cur_author
+        page = self.paginate_keyset(Book.objects.filter(authors=self.object).defer('search_vector'))
+        context['books'] = page.object_list
+        context['page_obj'] = page
         return context
 
 
@@ -286,26 +375,39 @@ class DeleteAuthorView(View):
 
 
 # VIEWS FOR BOOK FUNCTIONALITY(BOOK VIEW, CREATE, UPDATE, DELETE)
-class BookDetailView(DetailView):
+class BookDetailView(AnonymousPageCacheMixin, ConditionalGetMixin, DetailView):
     model = Book
     template_name = 'books/book_detail.html'
     context_object_name = 'book'
+    page_cache_kind = 'book'
+    page_cache_kwarg = 'isbn'
+
+    def get_last_modified(self):
+        return self.get_object().updated_at
+
+    def get_version_namespaces(self):
+        # the borrow buttons depend on the viewer's requests for this book
+        if self.request.user.is_authenticated:
+            return ('navigation', 'recommendations', 'requests')
+        return ('navigation', 'recommendations')
+
+    def get_page_cache_namespaces(self):
+        return (*super().get_page_cache_namespaces(), 'recommendations')
 
     def get_object(self, queryset=None):
-        isbn = self.kwargs.get('isbn')
-        return self.model.objects.get(isbn=isbn)
+        return get_loader(self.request).get(self.model.objects.defer('search_vector'), 'isbn', self.kwargs.get('isbn'))
+
+    def get_borrow_requests(self, book):
+        # through the reverse relation, so request.book is this very instance
+        return book.borrowrequestmodel_set.filter(borrower=self.request.user)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        user = self.request.user
-        book = self.get_object()
+        # only now that the page is rendered, not for a 304
+        prefetch_related_objects([self.object], 'authors', 'genre')
+        context['recommendations'] = list(get_recommendations(self.object))
         if self.request.user.is_authenticated:
-            borrow_requests = BorrowRequestModel.objects.filter(borrower=user, book=book)
-            if borrow_requests.exists():
-                context['borrow_request'] = borrow_requests.first()
-            else:
-                context['borrow_request'] = None
-
+            context['borrow_request'] = self.get_borrow_requests(self.object).first()
         return context
 
     def post(self, request):
@@ -362,9 +464,9 @@ class UpdateBookView(View):
             book.published_date = form.cleaned_data['published_date']
             book.publisher = form.cleaned_data['publisher']
             book.borrower = form.cleaned_data['borrower']
+            book.save()
             book.genre.set(form.cleaned_data['genre'])
             book.authors.set(form.cleaned_data['authors'])
-            book.save()
             url = reverse('main_view')
             return HttpResponseRedirect(url)
 
@@ -383,16 +485,53 @@ class DeleteBookView(View):
 
 
 # VIEWS FOR BORROW REQUEST FUNCTIONALITY(REQUESTS / BORROW REQUEST VIEW, APPROVE, DECLINE)
-class RequestsView(ListView):
+class RequestsView(KeysetPaginationMixin, ListView):
     template_name = 'user/requests_view.html'
     model = BorrowRequestModel
     context_object_name = 'requests'
+    keyset_ordering = ('-request_date', '-pk')
 
     def dispatch(self, request, *args, **kwargs):
         if not request.user.is_authenticated or not (request.user.is_librarian or request.user.is_staff):
             return redirect('main_view')
+        self.filter_form = RequestQueueFilterForm(request.GET)
+        # the hot table by default, finished requests moved out by archive_requests on demand
+        self.archived = request.GET.get('archive') == '1'
+        if self.archived:
+            self.model = BorrowRequestArchive
         return super().dispatch(request, *args, **kwargs)
 
+    def get_filtered_queryset(self):
+        if not self.filter_form.is_valid():
+            return self.model.objects.none()
+        return self.filter_form.filter(self.model.objects.all())
+
+    def get_queryset(self):
+        queryset = self.get_filtered_queryset().select_related('borrower', 'book').defer('book__search_vector')
+        status = self.filter_form.cleaned_data.get('status')
+        if status is not None:
+            queryset = queryset.filter(status=status)
+        return queryset
+
+    def get_status_counts(self):
+        # one aggregate over the filtered queue for every status tab
+        counts = self.get_filtered_queryset().aggregate(
+            total=Count('pk'),
+            **{str(status): Count('pk', filter=Q(status=status)) for status, _ in self.model.status_choices},
+        )
+        return [(None, 'All', counts['total'])] + [
+            (status, label, counts[str(status)]) for status, label in self.model.status_choices
+        ]
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['filter_form'] = self.filter_form
+        context['status'] = self.filter_form.cleaned_data.get('status') if self.filter_form.is_valid() else None
+        context['status_counts'] = self.get_status_counts()
+        context['archived'] = self.archived
+        context['live_updates'] = served_by_asgi(self.request)
+        return context
+
 
 class BorrowRequestView(DetailView):
     template_name = 'user/borrow_request_view.html'
@@ -411,7 +550,8 @@ class CreateBorrowRequestView(View):
         isbn = self.kwargs['isbn']
         book = Book.objects.get(isbn=isbn)
         user = request.user
-        self.model.objects.create(book=book, borrower=user, request_date=timezone.now().date())
+        borrow_request = self.model.objects.create(book=book, borrower=user, request_date=timezone.now().date())
+        publish_borrow_request(borrow_request)
 
         return redirect('profile_view', username=request.user.username)
 
@@ -425,9 +565,10 @@ class RequestApproveView(View):
         if not request.user.is_authenticated or not request.user.is_librarian:
             url = reverse('main_view')
             return HttpResponseRedirect(url)
-        book_request.status = 2
-        book_request.approval_date = timezone.now().date()
-        book_request.save()
+        try:
+            approve_request(book_request)
+        except InvalidTransition:
+            return redirect('borrow_request_view', id=id)
 
         return redirect('profile_view', username=request.user.username)
 
@@ -441,8 +582,10 @@ class RequestDeclineView(View):
         if not request.user.is_authenticated or not request.user.is_librarian:
             url = reverse('main_view')
             return HttpResponseRedirect(url)
-        book_request.status = 5
-        book_request.save()
+        try:
+            decline_request(book_request)
+        except InvalidTransition:
+            return redirect('borrow_request_view', id=id)
 
         return redirect('profile_view', username=request.user.username)
 
@@ -453,21 +596,14 @@ class TakeBookView(View):
 
     def get(self, request, *args, **kwargs):
         id = self.kwargs['id']
-        borrow_request = self.model.objects.get(id=id)
-        if not request.user.is_authenticated or borrow_request.borrower != request.user:
+        borrow_request = self.model.objects.select_related('book').get(id=id)
+        if not request.user.is_authenticated or borrow_request.borrower_id != request.user.pk:
             url = reverse('main_view')
             return HttpResponseRedirect(url)
-        if borrow_request.status != 2:
+        try:
+            take_book(borrow_request)
+        except InvalidTransition:
             return redirect('book_detail_view', isbn=borrow_request.book.isbn)
-        else:
-            borrow_request.status = 3
-            current_date = timezone.now().date()
-            new_date = current_date + timedelta(weeks=2)
-            borrow_request.due_date = new_date
-            borrow_request.save()
-            book = borrow_request.book
-            book.available = False
-            book.save()
 
         return redirect('profile_view', username=request.user.username)
 
@@ -477,21 +613,179 @@ class ReturnBookView(View):
 
     def get(self, request, *args, **kwargs):
         id = self.kwargs['id']
-        borrow_request = self.model.objects.get(id=id)
-        if not request.user.is_authenticated or borrow_request.borrower != request.user:
+        borrow_request = self.model.objects.select_related('book').get(id=id)
+        if not request.user.is_authenticated or borrow_request.borrower_id != request.user.pk:
             url = reverse('main_view')
             return HttpResponseRedirect(url)
-        if borrow_request.status != 3:
+        try:
+            return_book(borrow_request)
+        except InvalidTransition:
             return redirect('book_detail_view', isbn=borrow_request.book.isbn)
-        else:
-            borrow_request.status = 4
-            current_date = timezone.now().date()
-            if current_date > borrow_request.due_date:
-                borrow_request.overdue = True
-            borrow_request.complete_date = current_date
-            borrow_request.save()
-            book = borrow_request.book
-            book.available = True
-            book.save()
 
-        return redirect('profile_view', username=request.user.username)
\ No newline at end of file
+        return redirect('profile_view', username=request.user.username)
+
+# CIRCULATION STATISTICS FOR LIBRARIANS, READ FROM THE DAILY ROLLUPS
+class StatsView(View):
+    template_name = 'stats/stats_view.html'
+    windows = [(7, 'Last 7 days'), (30, 'Last 30 days'), (365, 'Last year'), (None, 'All time')]
+
+    def get(self, request):
+        if not request.user.is_authenticated or not (request.user.is_librarian or request.user.is_staff):
+            return redirect('main_view')
+        try:
+            days = parse_days(request.GET.get('days', '30'))
+        except ValueError:
+            # ?days=all, and anything else that is not a number of days
+            days = None
+        return render(request, self.template_name, {
+            'stats': circulation_stats(days),
+            'days': days,
+            'windows': self.windows,
+        })
+
+
+# LIVE BORROW REQUEST UPDATES FOR BORROWERS AND LIBRARIANS (SERVER-SENT EVENTS)
+class RequestEventsView(View):
+
+    async def get(self, request, *args, **kwargs):
+        if not served_by_asgi(request):
+            # a WSGI worker would buffer the whole stream and stay busy until
+            # it times out; 204 tells the browser not to reconnect
+            return HttpResponse(status=204)
+        user = await sync_to_async(get_user)(request)
+        if not user.is_authenticated:
+            return HttpResponseForbidden()
+        channels = [user_channel(user.pk)]
+        if user.is_librarian or user.is_staff:
+            channels.append(LIBRARIANS_CHANNEL)
+        response = StreamingHttpResponse(stream_events(channels), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+# AUTOCOMPLETE LOOKUPS FOR BOOK FORMS (AUTHORS, GENRES, BORROWERS)
+class AutocompleteView(View):
+    model = None
+    field = 'name'
+    librarian_only = False
+
+    def get(self, request):
+        if self.librarian_only and not (request.user.is_authenticated and (request.user.is_librarian or request.user.is_staff)):
+            return HttpResponseForbidden()
+        results = lookup_choices(self.model.objects.all(), self.field, request.GET.get('q', ''))
+        return JsonResponse({'results': results})
+
+
+class AuthorAutocompleteView(AutocompleteView):
+    model = Author
+
+
+class GenreAutocompleteView(AutocompleteView):
+    model = Genre
+
+
+class BorrowerAutocompleteView(AutocompleteView):
+    model = UserProfile
+    field = 'username'
+    librarian_only = True
+
+
+# EXPORTS FOR REPORTING (BOOKS, BORROW REQUESTS)
+class ExportView(View):
+
+    def get(self, request, dataset):
+        if not request.user.is_authenticated or not (request.user.is_librarian or request.user.is_staff):
+            return HttpResponseForbidden()
+        file_format = request.GET.get('format', 'csv')
+        if dataset not in EXPORTS or file_format not in CONTENT_TYPES:
+            raise Http404('Unknown export.')
+        lines = export_lines(dataset, file_format)
+        if served_by_asgi(request):
+            lines = aiter_lines(lines)
+        response = StreamingHttpResponse(lines, content_type=CONTENT_TYPES[file_format])
+        response['Content-Disposition'] = f'attachment; filename="{dataset}.{file_format}"'
+        return response
+
+
+# ASYNC READ VIEWS (MAIN, BOOK, AUTHOR, GENRE, PROFILE), SERVED INSTEAD OF THE SYNC ONES WHEN ASYNC_VIEWS IS ON
+class AsyncMainView(AsyncReadMixin, MainView):
+
+    async def get(self, request, *args, **kwargs):
+        page = await self.apaginate_keyset(self.get_queryset())
+        return self.render_to_response({'books': page.object_list, **self.get_page_context(page)})
+
+
+class AsyncBookDetailView(AsyncReadMixin, BookDetailView):
+
+    async def aget_object(self):
+        return await get_loader(self.request).aget(
+            self.model.objects.defer('search_vector'), 'isbn', self.kwargs.get('isbn')
+        )
+
+    async def aget_last_modified(self):
+        return (await self.aget_object()).updated_at
+
+    async def get(self, request, *args, **kwargs):
+        async def render_page():
+            book = await self.aget_object()
+            await sync_to_async(prefetch_related_objects)([book], 'authors', 'genre')
+            context = {
+                'book': book,
+                'object': book,
+                'recommendations': [recommendation async for recommendation in get_recommendations(book)],
+            }
+            if request.user.is_authenticated:
+                context['borrow_request'] = await self.get_borrow_requests(book).afirst()
+            return self.render_to_response(context)
+
+        return await self.aconditional_get(request, render_page)
+
+    async def post(self, request):
+        return redirect('main_view')
+
+
+class AsyncGenreView(AsyncReadMixin, GenreView):
+
+    async def aget_object(self):
+        return await get_loader(self.request).aget(self.model, 'name', self.kwargs.get('name'))
+
+    async def aget_last_modified(self):
+        return (await self.aget_object()).updated_at
+
+    async def get(self, request, *args, **kwargs):
+        async def render_page():
+            genre = await self.aget_object()
+            page = await self.apaginate_keyset(Book.objects.filter(genre=genre).defer('search_vector'))
+            return self.render_to_response({'genre': genre, 'object': genre, 'books': page.object_list, 'page_obj': page})
+
+        return await self.aconditional_get(request, render_page)
+
+
+class AsyncAuthorView(AsyncReadMixin, AuthorView):
+
+    async def aget_object(self):
+        return await get_loader(self.request).aget(self.model, 'name', self.kwargs.get('name'))
+
+    async def aget_last_modified(self):
+        return (await self.aget_object()).updated_at
+
+    async def get(self, request, *args, **kwargs):
+        async def render_page():
+            author = await self.aget_object()
+            page = await self.apaginate_keyset(Book.objects.filter(authors=author).defer('search_vector'))
+            return self.render_to_response({'author': author, 'object': author, 'books': page.object_list, 'page_obj': page})
+
+        return await self.aconditional_get(request, render_page)
+
+
+class AsyncProfileView(AsyncReadMixin, ProfileView):
+
+    async def get(self, request, *args, **kwargs):
+        user = await get_loader(request).aget(self.model, 'username', self.kwargs.get('username'))
+        requests = [borrow_request async for borrow_request in self.get_requests_queryset(user)]
+        self.set_borrowers(requests, await get_loader(request).aload_many(
+            UserProfile, {borrow_request.borrower_id for borrow_request in requests}
+        ))
+        context = {'user': user, 'object': user, **self.get_requests_context(user, requests)}
+        return self.render_to_response(context)
@@ -0,0 +1,37 @@
+from django import forms
+from django.urls import reverse_lazy
+
+
+class AutocompleteMixin:
+    """
+    Select widget that renders only the selected options; the remaining
+    choices are fetched on demand from a JSON lookup endpoint.
+    """
+
+    class Media:
+        js = ('myapp/autocomplete.js',)
+
+    def __init__(self, url_name, attrs=None):
+        attrs = {'class': 'form-control', **(attrs or {})}
+        attrs['data-autocomplete-url'] = reverse_lazy(url_name)
+        super().__init__(attrs=attrs)
+
+    def optgroups(self, name, value, attrs=None):
+        selected = [v for v in value if v]
+        options = []
+        if selected:
+            queryset = self.choices.queryset.filter(pk__in=selected)
+            for index, obj in enumerate(queryset):
+                option_value, label = self.choices.choice(obj)
+                options.append(self.create_option(name, option_value, label, True, index, attrs=attrs))
+        elif not self.allow_multiple_selected:
+            options.append(self.create_option(name, '', self.choices.field.empty_label or '', True, 0, attrs=attrs))
+        return [(None, options, 0)]
+
+
+class AutocompleteSelect(AutocompleteMixin, forms.Select):
+    pass
+
+
+class AutocompleteSelectMultiple(AutocompleteMixin, forms.SelectMultiple):
+    pass